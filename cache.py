@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from storage import write_atomic
+
+
+class TTLCache:
+    def __init__(self, ttl, path=None, max_stale=None):
+        self.ttl = ttl
+        self.path = path
+        self.max_stale = max_stale
+        self.entries = {}
+        self.inflight = {}
+        self.lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path, "r") as file:
+                    self.entries = {key: tuple(entry) for key, entry in json.load(file).items()}
+            except (OSError, ValueError):
+                self.entries = {}
+            self._prune(time.time())
+
+    def get(self, key, loader, stale_ok=True):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+            if entry is not None and self.max_stale is not None and entry[1] + self.max_stale <= now:
+                entry = None
+            future = self.inflight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self.inflight[key] = future
+
+        if entry is not None and stale_ok:
+            if is_owner:
+                threading.Thread(target=self._load, args=(key, loader, future), daemon=True).start()
+            return entry[0]
+        if is_owner:
+            self._load(key, loader, future)
+        return future.result()
+
+    def _load(self, key, loader, future):
+        try:
+            value = loader()
+        except BaseException as e:
+            with self.lock:
+                self.inflight.pop(key, None)
+            future.set_exception(e)
+            return
+        ttl = self.ttl() if callable(self.ttl) else self.ttl
+        with self.lock:
+            now = time.time()
+            self.entries[key] = (value, now + ttl)
+            self.inflight.pop(key, None)
+            self._prune(now)
+            self._save()
+        future.set_result(value)
+
+    def _prune(self, now):
+        if self.max_stale is None:
+            return
+        self.entries = {key: entry for key, entry in self.entries.items() if entry[1] + self.max_stale > now}
+
+    def _save(self):
+        if self.path is None:
+            return
+        try:
+            write_atomic(self.path, json.dumps(self.entries))
+        except (OSError, TypeError, ValueError):
+            pass
+
+
+class LRUCache:
+    def __init__(self, max_entries, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path, "r") as file:
+                    self.entries = OrderedDict(json.load(file))
+            except (OSError, ValueError):
+                self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            self._evict()
+            self._save()
+
+    def preload(self, entries):
+        with self.lock:
+            for key, value in entries.items():
+                if key not in self.entries:
+                    self.entries[key] = value
+                    self.entries.move_to_end(key, last=False)
+            self._evict()
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _save(self):
+        if self.path is None:
+            return
+        try:
+            write_atomic(self.path, json.dumps(self.entries))
+        except (OSError, TypeError, ValueError):
+            pass
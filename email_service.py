@@ -3,12 +3,526 @@ import smtplib
 import re
 import json
 import os
+import hashlib
+import queue
+import sqlite3
+import itertools
+import select
+import ssl
+import heapq
+import random
+import threading
+import time
+import uuid
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 from email.mime.text import MIMEText
-from email.parser import BytesParser
-from email.header import decode_header
 from rich.console import Console
 from rich.panel import Panel
 from rich import box
+from mail_cache import MailCache, quote_mailbox
+from storage import JournaledStore, write_atomic
+
+IDLE_CHANGE = re.compile(rb"\* \d+ (EXISTS|EXPUNGE|FETCH)")
+
+class IMAPSession:
+    def __init__(self, server, username, password, mailbox="inbox", keepalive_interval=240, timeout=60):
+        self.server = server
+        self.username = username
+        self.password = password
+        self.mailbox = mailbox
+        self.keepalive_interval = keepalive_interval
+        self.timeout = timeout
+        self.mail = None
+        self.last_used = 0
+        self.lock = threading.RLock()
+        self.stop_event = threading.Event()
+        self.keepalive_thread = None
+
+    def connect(self):
+        with self.lock:
+            self._disconnect()
+            mail = imaplib.IMAP4_SSL(self.server, timeout=self.timeout)
+            try:
+                mail.login(self.username, self.password)
+                status, data = mail.capability()
+                if status == "OK" and data and data[-1]:
+                    mail.capabilities = tuple(data[-1].decode("ascii", errors="replace").upper().split())
+                mail.select(quote_mailbox(self.mailbox))
+            except Exception:
+                mail.shutdown()
+                raise
+            self.mail = mail
+            self.last_used = time.monotonic()
+
+        if self.keepalive_thread is None:
+            self.stop_event.clear()
+            self.keepalive_thread = threading.Thread(target=self._keepalive, daemon=True)
+            self.keepalive_thread.start()
+        return self.mail
+
+    def run(self, operation):
+        with self.lock:
+            try:
+                result = operation(self.mail or self.connect())
+            except (imaplib.IMAP4.abort, OSError):
+                result = operation(self.connect())
+            self.last_used = time.monotonic()
+            return result
+
+    def idle(self, timeout, stop_event):
+        with self.lock:
+            mail = self.mail or self.connect()
+            tag = mail._new_tag()
+            mail.send(tag + b" IDLE\r\n")
+            if not mail.readline().startswith(b"+"):
+                raise imaplib.IMAP4.abort("Server rejected IDLE.")
+
+            changed = False
+            deadline = time.monotonic() + timeout
+            while not changed and not stop_event.is_set() and time.monotonic() < deadline:
+                if not self._has_input(mail):
+                    readable, _, _ = select.select([mail.sock], [], [], 1)
+                    if not readable:
+                        continue
+                line = mail.readline()
+                if not line:
+                    raise imaplib.IMAP4.abort("Connection closed during IDLE.")
+                changed = IDLE_CHANGE.match(line) is not None
+
+            mail.send(b"DONE\r\n")
+            while True:
+                line = mail.readline()
+                if not line:
+                    raise imaplib.IMAP4.abort("Connection closed while leaving IDLE.")
+                if line.startswith(tag):
+                    break
+                changed = changed or IDLE_CHANGE.match(line) is not None
+            self.last_used = time.monotonic()
+            return changed
+
+    def _has_input(self, mail):
+        timeout = mail.sock.gettimeout()
+        mail.sock.setblocking(False)
+        try:
+            return bool(mail.file.peek(1))
+        except (ssl.SSLWantReadError, BlockingIOError):
+            return False
+        finally:
+            mail.sock.settimeout(timeout)
+
+    def poll(self):
+        def check(mail):
+            for code in ("EXISTS", "EXPUNGE", "FETCH"):
+                mail.untagged_responses.pop(code, None)
+            mail.noop()
+            return any([mail.response(code)[1][0] is not None for code in ("EXISTS", "EXPUNGE", "FETCH")])
+        return self.run(check)
+
+    def _keepalive(self):
+        while not self.stop_event.wait(self.keepalive_interval):
+            with self.lock:
+                if self.mail is None or time.monotonic() - self.last_used < self.keepalive_interval:
+                    continue
+                try:
+                    self.mail.noop()
+                    self.last_used = time.monotonic()
+                except (imaplib.IMAP4.error, OSError):
+                    self._disconnect()
+
+    def _disconnect(self):
+        if self.mail is not None:
+            try:
+                self.mail.logout()
+            except (imaplib.IMAP4.error, OSError):
+                pass
+            self.mail = None
+
+    def close(self):
+        self.stop_event.set()
+        with self.lock:
+            self._disconnect()
+        self.keepalive_thread = None
+
+
+class SMTPSession:
+    def __init__(self, server, username, password, port=465, timeout=30):
+        self.server = server
+        self.username = username
+        self.password = password
+        self.port = port
+        self.timeout = timeout
+        self.smtp = None
+
+    def connect(self):
+        self.close()
+        smtp = smtplib.SMTP_SSL(self.server, self.port, timeout=self.timeout)
+        try:
+            smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self.smtp = smtp
+        return smtp
+
+    def sendmail(self, sender, recipients, message):
+        try:
+            return (self.smtp or self.connect()).sendmail(sender, recipients, message)
+        except smtplib.SMTPServerDisconnected:
+            return self.connect().sendmail(sender, recipients, message)
+
+    def close(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self.smtp.close()
+            self.smtp = None
+
+
+class Outbox:
+    def __init__(self, path, smtp_session, on_result, max_attempts=6, base_delay=5, max_delay=600):
+        self.path = path
+        self.smtp_session = smtp_session
+        self.on_result = on_result
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = False
+        self.thread = None
+        self.items = self.load()
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r") as file:
+                return json.load(file)
+        return []
+
+    def save(self):
+        write_atomic(self.path, json.dumps(self.items, indent=4))
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped = True
+        self.wakeup.set()
+
+    def enqueue(self, sender, recipients, message):
+        with self.lock:
+            self.items.append({
+                "id": uuid.uuid4().hex,
+                "from": sender,
+                "to": recipients,
+                "message": message,
+                "status": "pending",
+                "attempts": 0,
+                "next_attempt": 0,
+                "error": None,
+            })
+            self.save()
+        self.wakeup.set()
+
+    def pending_count(self):
+        with self.lock:
+            return sum(1 for item in self.items if item["status"] == "pending")
+
+    def _run(self):
+        try:
+            while not self.stopped:
+                with self.lock:
+                    pending = [item for item in self.items if item["status"] == "pending"]
+                now = time.time()
+                due = [item for item in pending if item["next_attempt"] <= now]
+                if not due:
+                    timeout = min((item["next_attempt"] for item in pending), default=now + 3600) - now
+                    self.wakeup.wait(max(timeout, 0))
+                    self.wakeup.clear()
+                    continue
+                self._deliver(due)
+        finally:
+            self.smtp_session.close()
+
+    def _deliver(self, items):
+        for item in items:
+            if self.stopped:
+                break
+            try:
+                self.smtp_session.sendmail(item["from"], item["to"], item["message"])
+                item["status"] = "sent"
+                self.on_result(f"✅ Email to {', '.join(item['to'])} sent.")
+            except (smtplib.SMTPException, OSError) as e:
+                item["attempts"] += 1
+                item["error"] = str(e)
+                if self._is_connection_error(e) or (self._is_transient(e) and item["attempts"] < self.max_attempts):
+                    delay = min(self.max_delay, self.base_delay * 2 ** min(item["attempts"] - 1, 16))
+                    item["next_attempt"] = time.time() + delay * random.uniform(0.8, 1.2)
+                else:
+                    item["status"] = "failed"
+                    self.on_result(f"❌ Email to {', '.join(item['to'])} could not be sent: {e}")
+                if self._is_connection_error(e):
+                    self.smtp_session.close()
+
+            with self.lock:
+                self.items = [pending for pending in self.items if pending["status"] != "sent"]
+                self.save()
+
+    def _is_transient(self, error):
+        if isinstance(error, smtplib.SMTPResponseException):
+            return 400 <= error.smtp_code < 500
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            return bool(error.recipients) and all(400 <= code < 500 for code, _ in error.recipients.values())
+        return self._is_connection_error(error)
+
+    def _is_connection_error(self, error):
+        return isinstance(error, smtplib.SMTPServerDisconnected) or not isinstance(error, smtplib.SMTPException)
+
+
+class MailPrefetcher:
+    def __init__(self, server, username, password, cache_file, mailbox, max_pending=32,
+                 index_batch_size=20, index_idle_delay=2):
+        self.server = server
+        self.username = username
+        self.password = password
+        self.cache_file = cache_file
+        self.mailbox = mailbox
+        self.index_batch_size = index_batch_size
+        self.index_idle_delay = index_idle_delay
+        self.jobs = queue.PriorityQueue(max_pending)
+        self.sequence = itertools.count()
+        self.generation = 0
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def schedule(self, body_uids, page_uids):
+        self.cancel()
+        for uid in body_uids:
+            self._put(0, "body", uid)
+        for priority, uids in enumerate(page_uids, start=1):
+            if uids:
+                self._put(priority, "headers", uids)
+
+    def cancel(self):
+        self.generation += 1
+        while True:
+            try:
+                self.jobs.get_nowait()
+            except queue.Empty:
+                break
+
+    def stop(self):
+        self.cancel()
+        self._put(-1, None, None)
+
+    def _put(self, priority, kind, target):
+        try:
+            self.jobs.put_nowait((priority, next(self.sequence), self.generation, kind, target))
+        except queue.Full:
+            pass
+
+    def _run(self):
+        session = IMAPSession(self.server, self.username, self.password, self.mailbox)
+        cache = MailCache(self.cache_file)
+        unreachable = set()
+        try:
+            while True:
+                try:
+                    priority, _, generation, kind, target = self.jobs.get(timeout=self.index_idle_delay)
+                except queue.Empty:
+                    self._index_bodies(session, cache, unreachable)
+                    continue
+                if kind is None:
+                    break
+                if generation != self.generation:
+                    continue
+                try:
+                    if kind == "headers":
+                        cached = cache.summaries(self.mailbox, target)
+                        missing = [uid for uid in target if uid not in cached]
+                        if missing:
+                            session.run(lambda mail: cache.fetch_headers(mail, self.mailbox, missing))
+                    elif kind == "body":
+                        message = cache.message(self.mailbox, target)
+                        if message is not None and message["body"] is None:
+                            session.run(lambda mail: cache.fetch_body(mail, self.mailbox, target))
+                except (imaplib.IMAP4.error, OSError, sqlite3.Error):
+                    continue
+        finally:
+            session.close()
+            cache.close()
+
+    def _index_bodies(self, session, cache, unreachable):
+        try:
+            uids = cache.unindexed_uids(self.mailbox, self.index_batch_size + len(unreachable))
+            for uid in [uid for uid in uids if uid not in unreachable][:self.index_batch_size]:
+                if not self.jobs.empty():
+                    return
+                message = session.run(lambda mail: cache.fetch_body(mail, self.mailbox, uid))
+                if message is None or message["body"] is None:
+                    unreachable.add(uid)
+        except (imaplib.IMAP4.error, OSError, sqlite3.Error):
+            return
+
+
+class MailWatcher:
+    def __init__(self, server, username, password, cache_file, mailbox, on_change,
+                 idle_timeout=600, poll_interval=60, retry_interval=30):
+        self.server = server
+        self.username = username
+        self.password = password
+        self.cache_file = cache_file
+        self.mailbox = mailbox
+        self.on_change = on_change
+        self.idle_timeout = idle_timeout
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self.stop_event = threading.Event()
+        self.is_current = False
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        session = IMAPSession(self.server, self.username, self.password, self.mailbox)
+        cache = MailCache(self.cache_file)
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    mail_ids = session.run(lambda mail: cache.sync_index(mail, self.mailbox))
+                    self.is_current = True
+                    self.on_change(mail_ids, cache.unread_count(self.mailbox))
+                    self._wait_for_change(session)
+                except (imaplib.IMAP4.error, OSError, sqlite3.Error):
+                    self.is_current = False
+                    self.stop_event.wait(self.retry_interval)
+        finally:
+            self.is_current = False
+            session.close()
+            cache.close()
+
+    def _wait_for_change(self, session):
+        supports_idle = "IDLE" in session.run(lambda mail: mail.capabilities)
+        while not self.stop_event.is_set():
+            if supports_idle:
+                if session.idle(self.idle_timeout, self.stop_event):
+                    return
+            elif not self.stop_event.wait(self.poll_interval) and session.poll():
+                return
+
+
+class SyncEngine:
+    def __init__(self, max_workers=8, connections_per_account=3):
+        self.connections_per_account = connections_per_account
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mail-sync")
+        self.accounts = {}
+
+    def register(self, username, password, folders, server="imap.gmail.com", cache_file=None):
+        self.accounts[username] = {
+            "username": username,
+            "password": password,
+            "server": server,
+            "folders": list(folders),
+            "cache_file": cache_file or f"mail_cache_{username}.db",
+            "slots": threading.BoundedSemaphore(self.connections_per_account),
+            "sessions": queue.LifoQueue(),
+        }
+
+    def unregister(self, username):
+        account = self.accounts.pop(username, None)
+        if account is not None:
+            self._close_sessions(account)
+
+    def sync_all(self, usernames=None):
+        futures = {}
+        for username, account in self.accounts.items():
+            if usernames is not None and username not in usernames:
+                continue
+            for folder in account["folders"]:
+                futures[self.executor.submit(self._sync_folder, account, folder)] = (username, folder)
+
+        errors = {}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except (imaplib.IMAP4.error, OSError, sqlite3.Error, RuntimeError) as e:
+                errors[futures[future]] = e
+        return errors
+
+    def fetch_body(self, username, folder, uid):
+        def fetch(mail, cache):
+            mail.select(quote_mailbox(folder))
+            return cache.fetch_body(mail, folder, uid)
+        return self._with_session(self.accounts[username], fetch)
+
+    def unified_view(self, offset, limit):
+        streams = []
+        for account in list(self.accounts.values()):
+            for folder in account["folders"]:
+                rows = self._latest(account, folder, offset + limit)
+                streams.append([dict(row, account=account["username"], folder=folder) for row in rows])
+        merged = heapq.merge(*streams, key=lambda row: (row["date"] is not None, row["date"] or 0), reverse=True)
+        return list(itertools.islice(merged, offset, offset + limit))
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for account in self.accounts.values():
+            self._close_sessions(account)
+        self.accounts = {}
+
+    def _latest(self, account, folder, limit):
+        cache = MailCache(account["cache_file"])
+        try:
+            rows = cache.latest(folder, limit)
+            missing = [row["uid"] for row in rows if row["sender"] is None]
+            if missing:
+                def fetch(mail, session_cache):
+                    mail.select(quote_mailbox(folder))
+                    session_cache.fetch_headers(mail, folder, missing)
+                try:
+                    self._with_session(account, fetch)
+                    rows = cache.latest(folder, limit)
+                except (imaplib.IMAP4.error, OSError, sqlite3.Error):
+                    pass
+            return [row for row in rows if row["sender"] is not None]
+        finally:
+            cache.close()
+
+    def _sync_folder(self, account, folder):
+        return self._with_session(account, lambda mail, cache: cache.sync(mail, folder))
+
+    def _with_session(self, account, operation):
+        with account["slots"]:
+            try:
+                session = account["sessions"].get_nowait()
+            except queue.Empty:
+                session = IMAPSession(account["server"], account["username"], account["password"], account["folders"][0])
+            cache = MailCache(account["cache_file"])
+            try:
+                return session.run(lambda mail: operation(mail, cache))
+            finally:
+                cache.close()
+                account["sessions"].put(session)
+
+    def _close_sessions(self, account):
+        while True:
+            try:
+                account["sessions"].get_nowait().close()
+            except queue.Empty:
+                break
+
 
 class EmailService:
     def __init__(self):
@@ -21,11 +535,25 @@ class EmailService:
         self.is_logged_in = False
         self.page = 0
         self.page_size = 5
-        self.mail_ids = []
+        self.mail_ids = array("I")
+        self.inbox_ids = None
         self.prompt_shown = False
-        self.favorites = []
+        self.favorites = None
         self.current_page_mail_ids = []
         self.signature = ""  
+        self.session = None
+        self.cache = None
+        self.prefetcher = None
+        self.watcher = None
+        self.outbox = None
+        self.sync_engine = None
+        self.mailbox = "inbox"
+        self.sync_folders = [self.mailbox, "[Gmail]/Sent Mail"]
+        self.attachments_dir = "attachments"
+        self.search_active = False
+        self.unread_count = None
+        self.latest_uid = None
+        self.notifications = deque()
 
     def setup_credentials(self):
         if not self.prompt_shown:
@@ -44,39 +572,98 @@ class EmailService:
 
     def login(self):
         self.setup_credentials()
+        cache_file = f"mail_cache_{self.username}.db"
         try:
-            with imaplib.IMAP4_SSL(self.imap_server) as mail:
-                mail.login(self.username, self.password)
-                self.is_logged_in = True
-                self.name = self.username.split("@")[0].title()
-                self.console.print(f"[green]Hi, {self.name}! You are now logged in.[/green]")
-                self.favorites_file = f"favorites_{self.username}.json"
-                self.signature_file = f"signature_{self.username}.json"
-                self.load_favorites()
-                self.load_signature()  
+            self.session = IMAPSession(self.imap_server, self.username, self.password, self.mailbox)
+            self.session.connect()
+            self.complete_login(cache_file)
         except imaplib.IMAP4.error:
             self.console.print("[red]Authentication Error:[/red] Invalid credentials. Make sure you are using an App Password.")
             self.username = self.password = None
             self.is_logged_in = False
+            self.session = None
+        except OSError as e:
+            if os.path.exists(cache_file):
+                self.console.print(f"[yellow]Could not reach the mail server ({e}). Working offline from cached emails.[/yellow]")
+                self.complete_login(cache_file)
+            else:
+                self.session = None
+                self.console.print(f"[red]Error:[/red] {str(e)}")
         except Exception as e:
+            self.session = None
             self.console.print(f"[red]Error:[/red] {str(e)}")
 
+    def complete_login(self, cache_file):
+        self.is_logged_in = True
+        self.name = self.username.split("@")[0].title()
+        self.console.print(f"[green]Hi, {self.name}! You are now logged in.[/green]")
+        self.favorites_file = f"favorites_{self.username}.json"
+        self.favorite_bodies_dir = f"favorites_{self.username}_bodies"
+        self.signature_file = f"signature_{self.username}.json"
+        self.cache = MailCache(cache_file)
+        self.prefetcher = MailPrefetcher(self.imap_server, self.username, self.password, cache_file, self.mailbox)
+        self.prefetcher.start()
+        self.watcher = MailWatcher(self.imap_server, self.username, self.password, cache_file, self.mailbox, self.on_mail_change)
+        self.watcher.start()
+        smtp_session = SMTPSession(self.smtp_server, self.username, self.password)
+        self.outbox = Outbox(f"outbox_{self.username}.json", smtp_session, self.notifications.append)
+        self.outbox.start()
+        self.sync_engine = SyncEngine()
+        self.sync_engine.register(self.username, self.password, self.sync_folders, self.imap_server, cache_file)
+        self.load_favorites()
+        self.load_signature()  
+
     def logout(self):
+        if self.sync_engine is not None:
+            self.sync_engine.close()
+            self.sync_engine = None
+        if self.outbox is not None:
+            self.outbox.stop()
+            self.outbox = None
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
+            self.prefetcher = None
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
         self.username = self.password = self.name = None
         self.is_logged_in = False
-        self.favorites = []
+        if self.favorites is not None:
+            self.favorites.close()
+            self.favorites = None
+        self.unread_count = None
+        self.latest_uid = None
+        self.inbox_ids = None
+        self.mail_ids = array("I")
+        self.notifications.clear()
         self.console.print("[green]You have successfully logged out.[/green]")
 
     def load_favorites(self):
-        if os.path.exists(self.favorites_file):
-            with open(self.favorites_file, "r") as file:
-                self.favorites = json.load(file)
-        else:
-            self.favorites = []
+        self.favorites = JournaledStore(self.favorites_file, legacy_key=lambda entry: entry["subject"])
+        for key, entry in list(self.favorites.entries.items()):
+            if "body" in entry:
+                self.save_favorite_body(key, entry["body"])
+                self.favorites.put(key, {"key": key, "subject": entry["subject"], "from": entry["from"], "legacy": True})
 
-    def save_favorites(self):
-        with open(self.favorites_file, "w") as file:
-            json.dump(self.favorites, file, indent=4)
+    def favorite_body_path(self, key):
+        return os.path.join(self.favorite_bodies_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".txt")
+
+    def save_favorite_body(self, key, body):
+        os.makedirs(self.favorite_bodies_dir, exist_ok=True)
+        write_atomic(self.favorite_body_path(key), body)
+
+    def load_favorite_body(self, key):
+        try:
+            with open(self.favorite_body_path(key), "r", encoding="utf-8") as file:
+                return file.read()
+        except FileNotFoundError:
+            return "No content"
 
     def load_signature(self):
         if os.path.exists(self.signature_file):
@@ -100,6 +687,11 @@ class EmailService:
             self.console.print("[red]You need to log in first.[/red]")
             return
 
+        recipients = [address.strip() for address in to.split(",") if address.strip()]
+        if not recipients or not all(re.match(r"[^@]+@[^@]+\.[^@]+", address) for address in recipients):
+            self.console.print("[red]Invalid recipient address. Enter one or more addresses separated by commas (e.g., user@gmail.com).[/red]")
+            return
+
         include_signature = self.console.input("🖊️ [bold cyan]Do you want to include your signature? (y/n): [/bold cyan]").strip().lower()
         if include_signature == 'y' and self.signature:
             full_message = f"{message}\n\n{self.signature}"
@@ -112,11 +704,8 @@ class EmailService:
             msg["From"] = self.username
             msg["To"] = to
 
-            with smtplib.SMTP_SSL(self.smtp_server, 465) as server:
-                server.login(self.username, self.password)
-                server.sendmail(self.username, to, msg.as_string())
-            
-            self.console.print("[green]Email sent successfully![/green]")
+            self.outbox.enqueue(self.username, recipients, msg.as_string())
+            self.console.print("[green]Email queued for delivery. You'll be notified once it is sent.[/green]")
         except Exception as e:
             self.console.print(f"[red]Error sending email:[/red] {str(e)}")
 
@@ -128,52 +717,182 @@ class EmailService:
 
         try:
             with self.console.status("📧  Checking emails...", spinner="dots"):
-                with imaplib.IMAP4_SSL(self.imap_server) as mail:
-                    mail.login(self.username, self.password)
-                    mail.select('inbox')
-                    status, messages = mail.search(None, 'ALL')
-                    self.mail_ids = messages[0].split()
-                    total_emails = len(self.mail_ids)
-                    self.page = 0
-                    self.console.print(f"[green]Total emails:[/green] {total_emails}")
+                if not self.watcher.is_current or self.inbox_ids is None:
+                    try:
+                        self.inbox_ids = self.session.run(lambda mail: self.cache.sync_index(mail, self.mailbox))
+                    except (imaplib.IMAP4.abort, OSError) as e:
+                        self.console.print(f"[yellow]Could not sync with the mail server ({e}). Showing cached emails.[/yellow]")
+                        self.inbox_ids = self.cache.uids(self.mailbox)
+                self.mail_ids = self.inbox_ids
+                self.search_active = False
+                total_emails = len(self.mail_ids)
+                self.page = 0
+                self.console.print(f"[green]Total emails:[/green] {total_emails}")
             self.display_emails()
         except imaplib.IMAP4.error:
             self.console.print("[red]Authentication Error:[/red] Invalid credentials.")
         except Exception as e:
             self.console.print(f"[red]Error:[/red] {str(e)}")
 
+    def add_account(self):
+        username = self.console.input("Gmail address: ").strip()
+        if not re.match(r"[^@]+@[^@]+\.[^@]+", username):
+            self.console.print("[red]Invalid email format. Please enter a valid email address (e.g., user@gmail.com).[/red]")
+            return
+        if username in self.sync_engine.accounts:
+            self.console.print(f"[yellow]{username} is already added.[/yellow]")
+            return
+        password = self.console.input("App Password (not your Gmail password): ", password=True)
+        folders = self.console.input("Folders to sync, comma separated (press Enter for INBOX): ").strip()
+        folders = [folder.strip() for folder in folders.split(",") if folder.strip()] or ["INBOX"]
+
+        self.sync_engine.register(username, password, folders, self.imap_server)
+        with self.console.status(f"🔄  Syncing {username}...", spinner="dots"):
+            errors = self.sync_engine.sync_all([username])
+        if any(isinstance(error, imaplib.IMAP4.error) and not isinstance(error, imaplib.IMAP4.abort) for error in errors.values()):
+            self.sync_engine.unregister(username)
+            self.console.print("[red]Authentication Error:[/red] Invalid credentials. Make sure you are using an App Password.")
+            return
+        self.report_sync_errors(errors)
+        self.console.print(f"[green]{username} added. Its mail now appears under All Mailboxes.[/green]")
+
+    def report_sync_errors(self, errors):
+        for (username, folder), error in errors.items():
+            self.console.print(f"[yellow]Could not sync {folder} for {username}: {error}[/yellow]")
+
+    def display_unified_inbox(self):
+        with self.console.status("🔄  Syncing all mailboxes...", spinner="dots"):
+            errors = self.sync_engine.sync_all()
+        self.report_sync_errors(errors)
+
+        page = 0
+        while True:
+            entries = self.sync_engine.unified_view(page * self.page_size, self.page_size + 1)
+            has_next = len(entries) > self.page_size
+            entries = entries[:self.page_size]
+
+            self.console.print(f"[bold cyan]All Mailboxes (Page {page + 1}):[/bold cyan]")
+            for i, entry in enumerate(entries, start=1):
+                self.console.print(Panel(
+                    f"[bold]Account:[/bold] {entry['account']} ({entry['folder']})\n"
+                    f"[bold]From:[/bold] {entry['sender']}\n[bold]Subject:[/bold] {entry['subject']}\n"
+                    f"[bold]Date:[/bold] {self.format_date(entry['date'])}",
+                    title=f"📨 Email {i} Summary",
+                    border_style="green",
+                    box=box.ROUNDED
+                ))
+
+            self.console.print("\n[bold cyan]Commands:[/bold cyan] [blue]next[/blue] | [blue]prev[/blue] | [blue]read <number>[/blue] | [blue]exit[/blue]")
+            command = self.console.input("\nEnter command: ").strip().lower()
+
+            if command == "next":
+                if has_next:
+                    page += 1
+                else:
+                    self.console.print("[red]No more pages.[/red]")
+            elif command == "prev":
+                if page > 0:
+                    page -= 1
+                else:
+                    self.console.print("[red]No previous pages.[/red]")
+            elif command.startswith("read "):
+                try:
+                    index = int(command.split(" ")[1]) - 1
+                    if 0 <= index < len(entries):
+                        entry = entries[index]
+                        message = self.sync_engine.fetch_body(entry["account"], entry["folder"], entry["uid"])
+                        self.console.print(Panel(
+                            f"[bold]From:[/bold] {message['sender']}\n[bold]Subject:[/bold] {message['subject']}\n\n[bold]Message:[/bold]\n{message['body']}",
+                            title="📨 Full Email",
+                            border_style="cyan",
+                            box=box.ROUNDED
+                        ))
+                    else:
+                        self.console.print("[red]Invalid selection. Choose a number from the current page.[/red]")
+                except (IndexError, ValueError):
+                    self.console.print("[red]Invalid command. Use 'read <number>' to open an email.[/red]")
+                except (imaplib.IMAP4.error, OSError) as e:
+                    self.console.print(f"[red]Error displaying email details: {e}[/red]")
+            elif command == "exit":
+                break
+            else:
+                self.console.print("[red]Invalid command.[/red]")
+
+    def on_mail_change(self, mail_ids, unread_count):
+        if self.latest_uid is not None:
+            new_count = sum(1 for mail_id in mail_ids if mail_id > self.latest_uid)
+            if new_count:
+                self.notifications.append(f"📬 {new_count} new email(s) arrived. {unread_count} unread.")
+        self.latest_uid = max(mail_ids, default=0)
+        self.inbox_ids = mail_ids
+        if not self.search_active:
+            self.mail_ids = mail_ids
+        self.unread_count = unread_count
+
+    def pop_notifications(self):
+        while self.notifications:
+            yield self.notifications.popleft()
+
+    def page_mail_ids(self, page):
+        if page < 0:
+            return array("I")
+        start = page * self.page_size
+        return self.mail_ids[start:start + self.page_size]
+
     def display_emails(self):
         while True:
-            start = self.page * self.page_size
-            end = start + self.page_size
-            self.current_page_mail_ids = self.mail_ids[max(0, len(self.mail_ids) - end): len(self.mail_ids) - start]
+            self.current_page_mail_ids = self.page_mail_ids(self.page)
 
             self.console.print("[bold cyan]Emails (page {}/{}):[/bold cyan]".format(self.page + 1, (len(self.mail_ids) // self.page_size) + 1))
-            
+
+            summaries = self.load_summaries(self.current_page_mail_ids)
             for i, mail_id in enumerate(self.current_page_mail_ids, start=1):
-                with imaplib.IMAP4_SSL(self.imap_server) as mail:
-                    mail.login(self.username, self.password)
-                    mail.select('inbox')
-                    status, data = mail.fetch(mail_id, '(RFC822)')
-                    email_message = BytesParser().parsebytes(data[0][1])
-
-                    subject, encoding = decode_header(email_message.get("Subject", "No Subject"))[0]
-                    if isinstance(subject, bytes):
-                        subject = subject.decode(encoding or "utf-8") if encoding else subject.decode()
-
-                    from_address = email_message.get("From", "Unknown Sender")
-                    self.console.print(Panel(
-                        f"[bold]From:[/bold] {from_address}\n[bold]Subject:[/bold] {subject}",
-                        title=f"📨 Email {i} Summary",
-                        border_style="green",
-                        box=box.ROUNDED
-                    ))
-
-            self.console.print("\n[bold cyan]Commands:[/bold cyan] [blue]next[/blue] | [blue]prev[/blue] | [blue]go <page number>[/blue] | [blue]select <number>[/blue] | [blue]exit[/blue]")
+                summary = summaries.get(mail_id)
+                if summary is None:
+                    continue
+
+                self.console.print(Panel(
+                    f"[bold]From:[/bold] {summary['sender']}\n[bold]Subject:[/bold] {summary['subject']}\n[bold]Date:[/bold] {self.format_date(summary['date'])}",
+                    title=f"📨 Email {i} Summary",
+                    border_style="green",
+                    box=box.ROUNDED
+                ))
+
+            self.prefetcher.schedule(
+                self.current_page_mail_ids,
+                [self.page_mail_ids(self.page + 1), self.page_mail_ids(self.page - 1)],
+            )
+            self.console.print("\n[bold cyan]Commands:[/bold cyan] [blue]next[/blue] | [blue]prev[/blue] | [blue]go <page number>[/blue] | [blue]select <number>[/blue] | [blue]search <query>[/blue] | [blue]all[/blue] | [blue]exit[/blue]")
             
             if not self.pagination_controls():
                 break
 
+    def load_summaries(self, mail_ids):
+        summaries = self.cache.summaries(self.mailbox, mail_ids)
+        missing = [mail_id for mail_id in mail_ids if mail_id not in summaries]
+        if missing:
+            try:
+                self.session.run(lambda mail: self.cache.fetch_headers(mail, self.mailbox, missing))
+                summaries = self.cache.summaries(self.mailbox, mail_ids)
+            except (imaplib.IMAP4.abort, OSError):
+                self.console.print("[yellow]Some emails are not cached yet and the mail server is unreachable.[/yellow]")
+        return summaries
+
+    def search_emails(self, query):
+        with self.console.status("🔎  Searching emails...", spinner="dots"):
+            results = set(self.cache.search(self.mailbox, query))
+            try:
+                results.update(self.session.run(lambda mail: self.cache.search_server(mail, self.mailbox, query)))
+            except (imaplib.IMAP4.error, OSError):
+                self.console.print("[yellow]Mail server unreachable. Showing matches from indexed emails only.[/yellow]")
+        ordering = self.inbox_ids if self.inbox_ids is not None else self.cache.uids(self.mailbox)
+        return array("I", (mail_id for mail_id in ordering if mail_id in results))
+
+    def format_date(self, timestamp):
+        if timestamp is None:
+            return "Unknown Date"
+        return datetime.fromtimestamp(timestamp).strftime("%a, %d %b %Y %H:%M")
+
     def pagination_controls(self):
         while True:
             command = self.console.input("\nEnter command: ").strip().lower()
@@ -194,6 +913,7 @@ class EmailService:
                 try:
                     page_number = int(command.split(" ")[1]) - 1
                     if 0 <= page_number <= len(self.mail_ids) // self.page_size:
+                        self.prefetcher.cancel()
                         self.page = page_number
                         return True
                     else:
@@ -210,6 +930,26 @@ class EmailService:
                         self.console.print("[red]Invalid selection. Choose a number from the current page.[/red]")
                 except (IndexError, ValueError):
                     self.console.print("[red]Invalid command. Use 'select <number>' to choose an email.[/red]")
+            elif command.startswith("search "):
+                query = command[len("search "):].strip()
+                if not query:
+                    self.console.print("[red]Invalid command. Use 'search <query>' to find emails.[/red]")
+                    continue
+                results = self.search_emails(query)
+                if results:
+                    self.console.print(f"[green]Found {len(results)} email(s) matching '{query}'.[/green]")
+                    self.search_active = True
+                    self.mail_ids = results
+                    self.page = 0
+                    return True
+                self.console.print(f"[yellow]No emails found matching '{query}'.[/yellow]")
+            elif command == "all":
+                self.search_active = False
+                if self.inbox_ids is None:
+                    self.inbox_ids = self.cache.uids(self.mailbox)
+                self.mail_ids = self.inbox_ids
+                self.page = 0
+                return True
             elif command == "exit":
                 return False
             else:
@@ -217,64 +957,126 @@ class EmailService:
 
     def display_email_detail(self, mail_id):
         try:
-            with imaplib.IMAP4_SSL(self.imap_server) as mail:
-                mail.login(self.username, self.password)
-                mail.select('inbox')
-                status, data = mail.fetch(mail_id, '(RFC822)')
-                email_message = BytesParser().parsebytes(data[0][1])
-
-                subject, encoding = decode_header(email_message.get("Subject", "No Subject"))[0]
-                if isinstance(subject, bytes):
-                    subject = subject.decode(encoding or "utf-8") if encoding else subject.decode()
-
-                from_address = email_message.get("From", "Unknown Sender")
-                body = email_message.get_payload(decode=True).decode("utf-8", errors="ignore") if email_message.get_payload(decode=True) else "No content"
-
-                def display_email_commands(is_favorited):
-                    self.console.print(Panel(
-                        f"[bold]From:[/bold] {from_address}\n[bold]Subject:[/bold] {subject}\n\n[bold]Message:[/bold]\n{body}",
-                        title="📨 Full Email",
-                        border_style="cyan",
-                        box=box.ROUNDED
-                    ))
-                    command_options = "[blue]remove favorite[/blue]" if is_favorited else "[blue]favorite[/blue]"
-                    self.console.print(f"\n[bold yellow]Commands:[/bold yellow] {command_options} | [blue]back[/blue]")
-
-                is_favorited = any(fav["subject"] == subject for fav in self.favorites)
-                display_email_commands(is_favorited)
-
-                while True:
-                    command = self.console.input("\nEnter command: ").strip().lower()
-
-                    if command == "favorite" and not is_favorited:
-                        self.add_to_favorites(subject, from_address, body)
-                        is_favorited = True
-                        display_email_commands(is_favorited)
-                    elif command == "remove favorite" and is_favorited:
-                        self.remove_from_favorites(subject)
-                        is_favorited = False
-                        display_email_commands(is_favorited)
-                    elif command == "back":
-                        return  
-                    else:
-                        self.console.print("[red]Invalid command. Please try again.[/red]")
+            message = self.cache.message(self.mailbox, mail_id)
+            if message is None or message["body"] is None:
+                message = self.session.run(lambda mail: self.cache.fetch_body(mail, self.mailbox, mail_id))
+
+            if "\\Seen" not in message["flags"]:
+                try:
+                    self.session.run(lambda mail: self.cache.mark_seen(mail, self.mailbox, mail_id))
+                except (imaplib.IMAP4.error, OSError):
+                    pass
+
+            subject = message["subject"]
+            from_address = message["sender"]
+            body = message["body"]
+            attachments = json.loads(message["attachments"] or "[]")
+
+            def display_email_commands(is_favorited):
+                attachment_lines = "".join(
+                    f"\n{i}. {attachment['filename'] or attachment['type']} ({self.format_size(attachment['size'])})"
+                    for i, attachment in enumerate(attachments, start=1)
+                )
+                self.console.print(Panel(
+                    f"[bold]From:[/bold] {from_address}\n[bold]Subject:[/bold] {subject}\n\n[bold]Message:[/bold]\n{body}"
+                    + (f"\n\n[bold]Attachments:[/bold]{attachment_lines}" if attachments else ""),
+                    title="📨 Full Email",
+                    border_style="cyan",
+                    box=box.ROUNDED
+                ))
+                command_options = "[blue]remove favorite[/blue]" if is_favorited else "[blue]favorite[/blue]"
+                if attachments:
+                    command_options += " | [blue]save <number>[/blue]"
+                self.console.print(f"\n[bold yellow]Commands:[/bold yellow] {command_options} | [blue]back[/blue]")
+
+            favorite_key = self.resolve_favorite_key(message["message_id"], subject, from_address)
+            is_favorited = favorite_key in self.favorites
+            display_email_commands(is_favorited)
+
+            while True:
+                command = self.console.input("\nEnter command: ").strip().lower()
+
+                if command == "favorite" and not is_favorited:
+                    self.add_to_favorites(favorite_key, subject, from_address, body)
+                    is_favorited = True
+                    display_email_commands(is_favorited)
+                elif command == "remove favorite" and is_favorited:
+                    self.remove_from_favorites(favorite_key)
+                    is_favorited = False
+                    display_email_commands(is_favorited)
+                elif command.startswith("save ") and attachments:
+                    try:
+                        index = int(command.split(" ")[1]) - 1
+                        if 0 <= index < len(attachments):
+                            self.save_attachment(mail_id, attachments[index])
+                        else:
+                            self.console.print("[red]Invalid selection. Choose a number from the attachment list.[/red]")
+                    except (IndexError, ValueError):
+                        self.console.print("[red]Invalid command. Use 'save <number>' to download an attachment.[/red]")
+                elif command == "back":
+                    return  
+                else:
+                    self.console.print("[red]Invalid command. Please try again.[/red]")
 
         except Exception as e:
             self.console.print(f"[red]Error displaying email details: {e}[/red]")
 
-    def add_to_favorites(self, subject, from_address, body):
-        favorite_entry = {
-            "subject": subject,
-            "from": from_address,
-            "body": body
-        }
-        self.favorites.append(favorite_entry)
-        self.save_favorites()
+    def save_attachment(self, mail_id, attachment):
+        os.makedirs(self.attachments_dir, exist_ok=True)
+        filename = os.path.basename(attachment["filename"] or "") or f"attachment-{mail_id}-{attachment['section']}"
+        name, extension = os.path.splitext(filename)
+        path = os.path.join(self.attachments_dir, filename)
+        copy = 1
+        while os.path.exists(path):
+            path = os.path.join(self.attachments_dir, f"{name} ({copy}){extension}")
+            copy += 1
+
+        def download(mail, file):
+            file.seek(0)
+            file.truncate()
+            return self.cache.download_attachment(mail, mail_id, attachment, file)
+
+        try:
+            with self.console.status(f"💾  Downloading {filename}...", spinner="dots"):
+                with open(path, "wb") as file:
+                    self.session.run(lambda mail: download(mail, file))
+            self.console.print(f"[green]Attachment saved to {path}[/green]")
+        except (imaplib.IMAP4.error, OSError) as e:
+            if os.path.exists(path):
+                os.remove(path)
+            self.console.print(f"[red]Error saving attachment:[/red] {str(e)}")
+
+    def format_size(self, size):
+        for unit in ("B", "KB", "MB"):
+            if size < 1024:
+                return f"{size:.0f} {unit}"
+            size /= 1024
+        return f"{size:.1f} GB"
+
+    def resolve_favorite_key(self, message_id, subject, sender):
+        legacy = self.favorites.get(subject) if message_id and message_id not in self.favorites else None
+        if legacy is None or not legacy.get("legacy") or legacy["from"] != sender:
+            return message_id or subject
+        self.save_favorite_body(message_id, self.load_favorite_body(subject))
+        self.favorites.put(message_id, {"key": message_id, "subject": legacy["subject"], "from": legacy["from"]})
+        self.favorites.delete(subject)
+        try:
+            os.remove(self.favorite_body_path(subject))
+        except FileNotFoundError:
+            pass
+        return message_id
+
+    def add_to_favorites(self, key, subject, from_address, body):
+        self.save_favorite_body(key, body)
+        self.favorites.put(key, {"key": key, "subject": subject, "from": from_address})
         self.console.print("[green]Email added to favorites![/green]")
 
-    def remove_from_favorites(self, subject):
-        self.favorites = [entry for entry in self.favorites if entry["subject"] != subject]
-        self.save_favorites()
+    def remove_from_favorites(self, key):
+        self.favorites.delete(key)
+        try:
+            os.remove(self.favorite_body_path(key))
+        except FileNotFoundError:
+            pass
         self.console.print("[green]Email removed from favorites![/green]")
 
     def display_favorites(self):
@@ -283,7 +1085,7 @@ class EmailService:
         while True:
             start = page * page_size
             end = start + page_size
-            entries = self.favorites[start:end]
+            entries = self.favorites.page(start, end)
             self.console.print(f"[bold cyan]Favorite Emails (Page {page + 1}/{(len(self.favorites) - 1) // page_size + 1}):[/bold cyan]")
             
             for i, entry in enumerate(entries, start=1):
@@ -329,8 +1131,7 @@ class EmailService:
                 try:
                     index = int(command.split(" ")[1]) - 1
                     if 0 <= index < len(entries):
-                        self.remove_from_favorites(entries[index]["subject"])
-                        entries.pop(index)
+                        self.remove_from_favorites(entries[index]["key"])
                     else:
                         self.console.print("[red]Invalid selection. Please choose a valid number.[/red]")
                 except (IndexError, ValueError):
@@ -341,9 +1142,10 @@ class EmailService:
                 self.console.print("[red]Invalid command. Please try again.[/red]")
 
     def display_full_favorite(self, entry):
+        body = self.load_favorite_body(entry["key"])
         while True:
             self.console.print(Panel(
-                f"[bold]From:[/bold] {entry['from']}\n[bold]Subject:[/bold] {entry['subject']}\n\n[bold]Message:[/bold]\n{entry['body']}",
+                f"[bold]From:[/bold] {entry['from']}\n[bold]Subject:[/bold] {entry['subject']}\n\n[bold]Message:[/bold]\n{body}",
                 title="⭐ Full Favorite Email",
                 border_style="cyan",
                 box=box.ROUNDED
@@ -352,7 +1154,7 @@ class EmailService:
 
             command = self.console.input("\nEnter command: ").strip().lower()
             if command == "remove favorite":
-                self.remove_from_favorites(entry["subject"])
+                self.remove_from_favorites(entry["key"])
                 break  
             elif command == "back":
                 break
@@ -0,0 +1,264 @@
+import sqlite3
+import time
+from storage import fts_query
+
+MAX_ENTRIES_PER_FEED = 500
+SEARCH_LIMIT = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feeds (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    modified TEXT,
+    fetched_at INTEGER,
+    last_visit REAL NOT NULL DEFAULT 0,
+    declared_interval REAL,
+    interval REAL,
+    next_refresh REAL NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS entries (
+    feed TEXT NOT NULL,
+    key TEXT NOT NULL,
+    title TEXT,
+    link TEXT,
+    summary TEXT,
+    published INTEGER NOT NULL DEFAULT 0,
+    added_at REAL NOT NULL,
+    read INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (feed, key)
+);
+CREATE INDEX IF NOT EXISTS entries_by_date ON entries (feed, published);
+"""
+
+INDEX_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS entry_index USING fts5(
+    title, summary, content='entries', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS entries_index_insert AFTER INSERT ON entries BEGIN
+    INSERT INTO entry_index (rowid, title, summary) VALUES (new.rowid, new.title, new.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_index_delete AFTER DELETE ON entries BEGIN
+    INSERT INTO entry_index (entry_index, rowid, title, summary) VALUES ('delete', old.rowid, old.title, old.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_index_update AFTER UPDATE OF title, summary ON entries BEGIN
+    INSERT INTO entry_index (entry_index, rowid, title, summary) VALUES ('delete', old.rowid, old.title, old.summary);
+    INSERT INTO entry_index (rowid, title, summary) VALUES (new.rowid, new.title, new.summary);
+END;
+CREATE VIRTUAL TABLE IF NOT EXISTS favorite_index USING fts5(key UNINDEXED, link UNINDEXED, title, summary);
+"""
+
+ENTRY_COLUMNS = "feed, key, title, link, published, read"
+
+FEED_COLUMNS = {
+    "last_visit": "REAL NOT NULL DEFAULT 0",
+    "declared_interval": "REAL",
+    "interval": "REAL",
+    "next_refresh": "REAL NOT NULL DEFAULT 0",
+    "failures": "INTEGER NOT NULL DEFAULT 0",
+}
+
+
+class FeedStore:
+    def __init__(self, path, max_entries=MAX_ENTRIES_PER_FEED):
+        self.path = path
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        columns = [row["name"] for row in self.conn.execute("PRAGMA table_info(feeds)")]
+        with self.conn:
+            for name, definition in FEED_COLUMNS.items():
+                if name not in columns:
+                    self.conn.execute(f"ALTER TABLE feeds ADD COLUMN {name} {definition}")
+        index_exists = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'entry_index'").fetchone()
+        favorite_columns = [row["name"] for row in self.conn.execute("PRAGMA table_info(favorite_index)")]
+        if favorite_columns and "key" not in favorite_columns:
+            with self.conn:
+                self.conn.execute("DROP TABLE favorite_index")
+        self.conn.executescript(INDEX_SCHEMA)
+        if not index_exists:
+            with self.conn:
+                self.conn.execute("INSERT INTO entry_index (entry_index) VALUES ('rebuild')")
+
+    def close(self):
+        self.conn.close()
+
+    def validators(self, url):
+        row = self.conn.execute("SELECT etag, modified FROM feeds WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None, None
+        return row["etag"], row["modified"]
+
+    def has_feed(self, url):
+        row = self.conn.execute("SELECT fetched_at FROM feeds WHERE url = ?", (url,)).fetchone()
+        return row is not None and row["fetched_at"] is not None
+
+    def save(self, url, etag, modified, entries, declared_interval=None):
+        now = time.time()
+        entries = sorted(entries, key=lambda entry: entry["published"], reverse=True)[:self.max_entries]
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO feeds (url, etag, modified, fetched_at, declared_interval) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET etag = excluded.etag, modified = excluded.modified, "
+                "fetched_at = excluded.fetched_at, declared_interval = excluded.declared_interval",
+                (url, etag, modified, int(now), declared_interval),
+            )
+            self.conn.executemany(
+                "INSERT INTO entries (feed, key, title, link, summary, published, added_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(feed, key) DO UPDATE SET title = excluded.title, link = excluded.link, "
+                "summary = excluded.summary, published = excluded.published "
+                "WHERE title IS NOT excluded.title OR summary IS NOT excluded.summary "
+                "OR published IS NOT excluded.published",
+                [
+                    (
+                        url,
+                        entry["id"] or entry["link"] or entry["title"],
+                        entry["title"],
+                        entry["link"],
+                        entry["summary"],
+                        entry["published"],
+                        now,
+                    )
+                    for entry in entries
+                    if entry["id"] or entry["link"] or entry["title"]
+                ],
+            )
+            self.conn.execute(
+                "DELETE FROM entries WHERE feed = ? AND rowid NOT IN ("
+                "SELECT rowid FROM entries WHERE feed = ? ORDER BY published DESC, added_at DESC LIMIT ?)",
+                (url, url, self.max_entries),
+            )
+
+    def touch(self, url):
+        with self.conn:
+            self.conn.execute("UPDATE feeds SET fetched_at = ? WHERE url = ?", (int(time.time()), url))
+
+    def refresh_state(self, url):
+        return self.conn.execute(
+            "SELECT declared_interval, interval, next_refresh, failures FROM feeds WHERE url = ?", (url,)
+        ).fetchone()
+
+    def schedule(self, url, interval, next_refresh, failures):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO feeds (url, interval, next_refresh, failures) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET interval = excluded.interval, "
+                "next_refresh = excluded.next_refresh, failures = excluded.failures",
+                (url, interval, next_refresh, failures),
+            )
+
+    def due_feeds(self, urls, now):
+        waiting = {row["url"] for row in self.conn.execute("SELECT url FROM feeds WHERE next_refresh > ?", (now,))}
+        return [url for url in urls if url not in waiting]
+
+    def recent_published(self, url, limit=20):
+        rows = self.conn.execute(
+            "SELECT published FROM entries WHERE feed = ? AND published > 0 ORDER BY published DESC LIMIT ?",
+            (url, limit),
+        )
+        return [row["published"] for row in rows]
+
+    def mark_visited(self, url):
+        with self.conn:
+            self.conn.execute("UPDATE feeds SET last_visit = ? WHERE url = ?", (time.time(), url))
+
+    def mark_read(self, url, key):
+        with self.conn:
+            self.conn.execute("UPDATE entries SET read = 1 WHERE feed = ? AND key = ?", (url, key))
+
+    def count(self, url):
+        return self.conn.execute("SELECT COUNT(*) FROM entries WHERE feed = ?", (url,)).fetchone()[0]
+
+    def page(self, url, offset, limit):
+        rows = self.conn.execute(
+            f"SELECT {ENTRY_COLUMNS} FROM entries WHERE feed = ? ORDER BY published DESC LIMIT ? OFFSET ?",
+            (url, limit, offset),
+        )
+        return [dict(row) for row in rows]
+
+    def summary(self, url, key):
+        row = self.conn.execute("SELECT summary FROM entries WHERE feed = ? AND key = ?", (url, key)).fetchone()
+        return row["summary"] if row is not None else None
+
+    def new_counts(self):
+        rows = self.conn.execute(
+            "SELECT feeds.url, COUNT(entries.key) FROM feeds "
+            "LEFT JOIN entries ON entries.feed = feeds.url AND entries.added_at > feeds.last_visit "
+            "GROUP BY feeds.url"
+        )
+        return {url: count for url, count in rows}
+
+    def timeline_count(self, urls):
+        placeholders = ", ".join("?" * len(urls))
+        return self.conn.execute(
+            f"SELECT COUNT(DISTINCT COALESCE(link, key)) FROM entries WHERE feed IN ({placeholders})",
+            list(urls),
+        ).fetchone()[0]
+
+    def timeline_page(self, urls, offset, limit):
+        placeholders = ", ".join("?" * len(urls))
+        rows = self.conn.execute(
+            f"SELECT feed, key, title, link, MAX(published) AS published, read FROM entries "
+            f"WHERE feed IN ({placeholders}) GROUP BY COALESCE(link, key) "
+            f"ORDER BY published DESC LIMIT ? OFFSET ?",
+            [*urls, limit, offset],
+        )
+        return [dict(row) for row in rows]
+
+    def index_favorites(self, favorites):
+        indexed = [row["key"] for row in self.conn.execute("SELECT key FROM favorite_index")]
+        if len(indexed) == len(favorites) and set(indexed) == {key for key, _ in favorites}:
+            return
+        with self.conn:
+            self.conn.execute("DELETE FROM favorite_index")
+            self.conn.executemany(
+                "INSERT INTO favorite_index (key, link, title, summary) VALUES (?, ?, ?, ?)",
+                [
+                    (key, favorite.get("link"), favorite.get("title"), favorite.get("summary"))
+                    for key, favorite in favorites
+                ],
+            )
+
+    def add_favorite(self, key, favorite):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO favorite_index (key, link, title, summary) VALUES (?, ?, ?, ?)",
+                (key, favorite.get("link"), favorite.get("title"), favorite.get("summary")),
+            )
+
+    def remove_favorite(self, key):
+        with self.conn:
+            self.conn.execute("DELETE FROM favorite_index WHERE key = ?", (key,))
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        if not query.split():
+            return []
+        match = fts_query(query)
+        entries = self.conn.execute(
+            "SELECT entries.feed, entries.key, entries.title, entries.link, entries.published, entries.read, "
+            "entry_index.rank AS rank FROM entry_index JOIN entries ON entries.rowid = entry_index.rowid "
+            "WHERE entry_index MATCH ? ORDER BY rank LIMIT ?",
+            (match, limit),
+        )
+        favorites = self.conn.execute(
+            "SELECT key, link, title, summary, rank FROM favorite_index WHERE favorite_index MATCH ? ORDER BY rank LIMIT ?",
+            (match, limit),
+        )
+        results = {}
+        for row in entries:
+            results.setdefault(row["link"] or row["key"], dict(row))
+        for row in favorites:
+            results.setdefault(row["link"] or row["key"], {
+                "feed": None,
+                "key": None,
+                "title": row["title"],
+                "link": row["link"],
+                "summary": row["summary"],
+                "published": 0,
+                "read": 1,
+                "rank": row["rank"],
+            })
+        return sorted(results.values(), key=lambda result: result["rank"])[:limit]
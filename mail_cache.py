@@ -0,0 +1,639 @@
+import binascii
+import bisect
+import itertools
+import json
+import quopri
+import re
+import sqlite3
+from array import array
+from email.header import decode_header, make_header
+from email.parser import BytesParser
+from email.utils import decode_rfc2231, parsedate_to_datetime
+from html.parser import HTMLParser
+from urllib.parse import unquote
+from storage import fts_query
+
+HEADER_FIELDS = "BODY.PEEK[HEADER.FIELDS (FROM SUBJECT DATE MESSAGE-ID)]"
+FETCH_BATCH_SIZE = 200
+EAGER_HEADER_LIMIT = 250
+SERVER_SEARCH_LIMIT = 2000
+ATTACHMENT_CHUNK_SIZE = 1024 * 1024
+
+FETCH_START = re.compile(rb"\d+ \(")
+ESEARCH_ALL = re.compile(rb"\bALL ([\d:,]+)")
+LITERAL_MARKER = re.compile(rb"\{\d+\}$")
+OPEN, CLOSE = object(), object()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mailboxes (
+    name TEXT PRIMARY KEY,
+    uidvalidity INTEGER NOT NULL,
+    last_uid INTEGER NOT NULL DEFAULT 0,
+    highest_modseq INTEGER
+);
+CREATE TABLE IF NOT EXISTS messages (
+    mailbox TEXT NOT NULL,
+    uidvalidity INTEGER NOT NULL,
+    uid INTEGER NOT NULL,
+    message_id TEXT,
+    sender TEXT,
+    subject TEXT,
+    date INTEGER,
+    flags TEXT NOT NULL DEFAULT '',
+    body TEXT,
+    attachments TEXT,
+    PRIMARY KEY (mailbox, uidvalidity, uid)
+);
+CREATE INDEX IF NOT EXISTS messages_by_date ON messages (mailbox, uidvalidity, date);
+"""
+
+INDEX_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS message_index USING fts5(
+    subject, sender, body, content='messages', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS messages_index_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO message_index (rowid, subject, sender, body) VALUES (new.rowid, new.subject, new.sender, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_index_delete AFTER DELETE ON messages BEGIN
+    INSERT INTO message_index (message_index, rowid, subject, sender, body)
+    VALUES ('delete', old.rowid, old.subject, old.sender, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_index_update AFTER UPDATE OF subject, sender, body ON messages BEGIN
+    INSERT INTO message_index (message_index, rowid, subject, sender, body)
+    VALUES ('delete', old.rowid, old.subject, old.sender, old.body);
+    INSERT INTO message_index (rowid, subject, sender, body) VALUES (new.rowid, new.subject, new.sender, new.body);
+END;
+"""
+
+
+def decode_header_value(value, default=""):
+    if value is None:
+        return default
+    try:
+        return str(make_header(decode_header(value)))
+    except (UnicodeDecodeError, LookupError):
+        return str(value)
+
+
+def parse_date(value):
+    try:
+        return int(parsedate_to_datetime(value).timestamp())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class HTMLTextExtractor(HTMLParser):
+    BLOCK_TAGS = {"br", "p", "div", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self.skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style") and self.skip_depth:
+            self.skip_depth -= 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+
+
+def html_to_text(html):
+    extractor = HTMLTextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    lines = (" ".join(line.split()) for line in "".join(extractor.parts).splitlines())
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def decode_content(data, encoding):
+    if encoding == "base64":
+        data = b"".join(data.split())
+        return binascii.a2b_base64(data + b"=" * (-len(data) % 4))
+    if encoding == "quoted-printable":
+        return quopri.decodestring(data)
+    return data
+
+
+class PartDecoder:
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self.pending = b""
+
+    def decode(self, chunk):
+        data = self.pending + chunk
+        if self.encoding == "base64":
+            data = b"".join(data.split())
+            cut = len(data) - len(data) % 4
+        elif self.encoding == "quoted-printable":
+            cut = data.rfind(b"\n") + 1
+        else:
+            return data
+        self.pending = data[cut:]
+        return decode_content(data[:cut], self.encoding)
+
+    def flush(self):
+        data, self.pending = self.pending, b""
+        return decode_content(data, self.encoding) if data else b""
+
+
+def text_value(value):
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return value
+
+
+def parameters(values):
+    if not isinstance(values, list):
+        return {}
+    params = {}
+    for key, value in zip(values[::2], values[1::2]):
+        key, value = text_value(key).lower(), text_value(value)
+        if key.endswith("*") and value:
+            charset, language, encoded = decode_rfc2231(value)
+            try:
+                params[key.rstrip("*")] = unquote(encoded, encoding=charset or "utf-8", errors="replace")
+            except LookupError:
+                params[key.rstrip("*")] = unquote(encoded, errors="replace")
+        else:
+            params.setdefault(key, value)
+    return params
+
+
+def body_parts(structure, section=""):
+    if structure and isinstance(structure[0], list):
+        parts = []
+        children = itertools.takewhile(lambda item: isinstance(item, list), structure)
+        for index, child in enumerate(children, start=1):
+            parts.extend(body_parts(child, f"{section}.{index}" if section else str(index)))
+        return parts
+
+    content_type = f"{text_value(structure[0])}/{text_value(structure[1])}".lower()
+    params = parameters(structure[2])
+    if content_type.startswith("text/"):
+        extension_index = 9
+    elif content_type == "message/rfc822":
+        extension_index = 11
+    else:
+        extension_index = 8
+    disposition = structure[extension_index] if len(structure) > extension_index else None
+    disposition_type, disposition_params = None, {}
+    if isinstance(disposition, list) and disposition:
+        disposition_type = text_value(disposition[0]).lower()
+        disposition_params = parameters(disposition[1] if len(disposition) > 1 else None)
+
+    filename = disposition_params.get("filename") or params.get("name")
+    is_text = content_type in ("text/plain", "text/html")
+    return [{
+        "section": section or "1",
+        "type": content_type,
+        "charset": params.get("charset") or "utf-8",
+        "encoding": (text_value(structure[5]) or "7bit").lower(),
+        "size": int(structure[6] or 0),
+        "filename": decode_header_value(filename) if filename else None,
+        "attachment": disposition_type == "attachment" or not is_text or (filename is not None and disposition_type != "inline"),
+    }]
+
+
+def choose_text_part(parts):
+    for content_type in ("text/plain", "text/html"):
+        for part in parts:
+            if part["type"] == content_type and not part["attachment"]:
+                return part
+    return None
+
+
+def decode_text_part(data, part):
+    content = decode_content(data, part["encoding"])
+    try:
+        text = content.decode(part["charset"], errors="replace")
+    except LookupError:
+        text = content.decode("utf-8", errors="replace")
+    return html_to_text(text) if part["type"] == "text/html" else text.strip()
+
+
+def quote_mailbox(name):
+    return '"{}"'.format(name.replace("\\", "\\\\").replace('"', '\\"'))
+
+
+def parse_uid_set(uid_set):
+    uids = array("I")
+    for piece in uid_set.split(b","):
+        if b":" in piece:
+            start, end = sorted(map(int, piece.split(b":")))
+            uids.extend(range(start, end + 1))
+        elif piece:
+            uids.append(int(piece))
+    return uids
+
+
+def compress_uid_set(uids):
+    ranges = []
+    for uid in sorted(uids):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ",".join(str(start) if start == end else f"{start}:{end}" for start, end in ranges)
+
+
+def tokenize(chunks):
+    for text, literal in chunks:
+        if literal is not None:
+            text = LITERAL_MARKER.sub(b"", text.rstrip())
+        position, length = 0, len(text)
+        while position < length:
+            char = text[position:position + 1]
+            if char in b" \r\n":
+                position += 1
+            elif char == b"(":
+                yield OPEN
+                position += 1
+            elif char == b")":
+                yield CLOSE
+                position += 1
+            elif char == b'"':
+                end = position + 1
+                value = bytearray()
+                while end < length and text[end:end + 1] != b'"':
+                    if text[end:end + 1] == b"\\":
+                        end += 1
+                    value += text[end:end + 1]
+                    end += 1
+                yield value.decode("utf-8", errors="replace")
+                position = end + 1
+            else:
+                end, depth = position, 0
+                while end < length:
+                    char = text[end:end + 1]
+                    if char == b"[":
+                        depth += 1
+                    elif char == b"]":
+                        depth -= 1
+                    elif depth == 0 and char in b" ()":
+                        break
+                    end += 1
+                atom = text[position:end].decode("utf-8", errors="replace")
+                yield None if atom.upper() == "NIL" else atom
+                position = end
+        if literal is not None:
+            yield literal
+
+
+def parse_tokens(tokens):
+    stack = [[]]
+    for token in tokens:
+        if token is OPEN:
+            stack.append([])
+        elif token is CLOSE:
+            if len(stack) > 1:
+                closed = stack.pop()
+                stack[-1].append(closed)
+        else:
+            stack[-1].append(token)
+    while len(stack) > 1:
+        closed = stack.pop()
+        stack[-1].append(closed)
+    return stack[0]
+
+
+def parse_fetch_response(data):
+    responses = []
+    for item in data:
+        text, literal = item if isinstance(item, tuple) else (item, None)
+        if not text and literal is None:
+            continue
+        if FETCH_START.match(text) or not responses:
+            responses.append([])
+        responses[-1].append((text, literal))
+
+    parsed = []
+    for chunks in responses:
+        tokens = parse_tokens(tokenize(chunks))
+        items = next((token for token in tokens if isinstance(token, list)), [])
+        fields = {text_value(key).upper(): value for key, value in zip(items[::2], items[1::2]) if key}
+        if "UID" not in fields:
+            continue
+
+        literal = next((value for key, value in fields.items() if key.startswith(("BODY[", "RFC822"))), None)
+        if isinstance(literal, str):
+            literal = literal.encode("utf-8")
+        flags = fields.get("FLAGS")
+        modseq = fields.get("MODSEQ")
+        parsed.append({
+            "uid": int(fields["UID"]),
+            "flags": " ".join(text_value(flag) for flag in flags) if isinstance(flags, list) else None,
+            "modseq": int(modseq[0]) if isinstance(modseq, list) and modseq else None,
+            "literal": literal,
+            "bodystructure": fields.get("BODYSTRUCTURE"),
+        })
+    return parsed
+
+
+class MailCache:
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        columns = [row["name"] for row in self.conn.execute("PRAGMA table_info(messages)")]
+        if "attachments" not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE messages ADD COLUMN attachments TEXT")
+                self.conn.execute("UPDATE messages SET body = NULL")
+        index_exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'message_index'"
+        ).fetchone()
+        self.conn.executescript(INDEX_SCHEMA)
+        if not index_exists:
+            with self.conn:
+                self.conn.execute("INSERT INTO message_index (message_index) VALUES ('rebuild')")
+
+    def close(self):
+        self.conn.close()
+
+    def mailbox_state(self, mailbox):
+        return self.conn.execute(
+            "SELECT uidvalidity, last_uid, highest_modseq FROM mailboxes WHERE name = ?", (mailbox,)
+        ).fetchone()
+
+    def uids(self, mailbox):
+        state = self.mailbox_state(mailbox)
+        if state is None:
+            return array("I")
+        rows = self.conn.execute(
+            "SELECT uid FROM messages WHERE mailbox = ? AND uidvalidity = ? ORDER BY uid DESC",
+            (mailbox, state["uidvalidity"]),
+        )
+        return array("I", (row[0] for row in rows))
+
+    def ordered_uids(self, mail, mailbox):
+        if "SORT" in mail.capabilities:
+            status, data = mail.uid("SORT", "(REVERSE DATE)", "UTF-8", "ALL")
+            if status == "OK" and data:
+                return array("I", map(int, (data[0] or b"").split()))
+        return self.uids(mailbox)
+
+    def server_uids(self, mail):
+        if "ESEARCH" in mail.capabilities:
+            status, data = mail.uid("SEARCH", "RETURN", "(ALL)", "ALL")
+            response = mail.response("ESEARCH")[1][0] or b""
+            match = ESEARCH_ALL.search(response)
+            return array("I", sorted(parse_uid_set(match.group(1)))) if match else array("I")
+        status, data = mail.uid("SEARCH", None, "ALL")
+        return array("I", sorted(map(int, data[0].split())))
+
+    def unread_count(self, mailbox):
+        state = self.mailbox_state(mailbox)
+        if state is None:
+            return 0
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM messages WHERE mailbox = ? AND uidvalidity = ? AND flags NOT LIKE '%\\Seen%'",
+            (mailbox, state["uidvalidity"]),
+        ).fetchone()[0]
+
+    def summaries(self, mailbox, uids):
+        state = self.mailbox_state(mailbox)
+        if state is None or not uids:
+            return {}
+        placeholders = ",".join("?" * len(uids))
+        rows = self.conn.execute(
+            f"SELECT uid, message_id, sender, subject, date, flags FROM messages "
+            f"WHERE mailbox = ? AND uidvalidity = ? AND sender IS NOT NULL AND uid IN ({placeholders})",
+            (mailbox, state["uidvalidity"], *uids),
+        )
+        return {row["uid"]: row for row in rows}
+
+    def latest(self, mailbox, limit):
+        state = self.mailbox_state(mailbox)
+        if state is None:
+            return []
+        rows = self.conn.execute(
+            "SELECT uid, message_id, sender, subject, date, flags FROM messages "
+            "WHERE mailbox = ? AND uidvalidity = ? AND date IS NOT NULL ORDER BY date DESC LIMIT ?",
+            (mailbox, state["uidvalidity"], limit),
+        ).fetchall()
+        if len(rows) < limit:
+            rows += self.conn.execute(
+                "SELECT uid, message_id, sender, subject, date, flags FROM messages "
+                "WHERE mailbox = ? AND uidvalidity = ? AND date IS NULL ORDER BY uid DESC LIMIT ?",
+                (mailbox, state["uidvalidity"], limit - len(rows)),
+            ).fetchall()
+        return rows
+
+    def message(self, mailbox, uid):
+        state = self.mailbox_state(mailbox)
+        if state is None:
+            return None
+        return self.conn.execute(
+            "SELECT * FROM messages WHERE mailbox = ? AND uidvalidity = ? AND uid = ?",
+            (mailbox, state["uidvalidity"], uid),
+        ).fetchone()
+
+    def search(self, mailbox, query):
+        state = self.mailbox_state(mailbox)
+        if state is None or not query.split():
+            return []
+        rows = self.conn.execute(
+            "SELECT messages.uid FROM message_index JOIN messages ON messages.rowid = message_index.rowid "
+            "WHERE message_index MATCH ? AND messages.mailbox = ? AND messages.uidvalidity = ?",
+            (fts_query(query), mailbox, state["uidvalidity"]),
+        )
+        return sorted(row["uid"] for row in rows)
+
+    def unindexed_uids(self, mailbox, limit=None):
+        state = self.mailbox_state(mailbox)
+        if state is None:
+            return []
+        rows = self.conn.execute(
+            "SELECT uid FROM messages WHERE mailbox = ? AND uidvalidity = ? AND body IS NULL ORDER BY uid DESC LIMIT ?",
+            (mailbox, state["uidvalidity"], -1 if limit is None else limit),
+        )
+        return [row["uid"] for row in rows]
+
+    def search_server(self, mail, mailbox, query, limit=SERVER_SEARCH_LIMIT):
+        uids = self.unindexed_uids(mailbox, limit)
+        if not uids:
+            return []
+        mail.literal = query.encode("utf-8")
+        status, data = mail.uid("SEARCH", "CHARSET", "UTF-8", "UID", compress_uid_set(uids), "TEXT")
+        if status != "OK" or not data or not data[0]:
+            return []
+        return sorted(map(int, data[0].split()))
+
+    def sync(self, mail, mailbox):
+        status, data = mail.select(quote_mailbox(mailbox))
+        if status != "OK":
+            raise RuntimeError(f"Unable to open mailbox '{mailbox}'.")
+        exists = int(data[0])
+        uidvalidity = int(mail.response("UIDVALIDITY")[1][0])
+        modseq_value = mail.response("HIGHESTMODSEQ")[1][0]
+        highest_modseq = int(modseq_value) if modseq_value else None
+
+        state = self.mailbox_state(mailbox)
+        if state is None or state["uidvalidity"] != uidvalidity:
+            with self.conn:
+                self.conn.execute("DELETE FROM messages WHERE mailbox = ?", (mailbox,))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO mailboxes (name, uidvalidity, last_uid, highest_modseq) VALUES (?, ?, 0, NULL)",
+                    (mailbox, uidvalidity),
+                )
+            last_uid, cached_modseq = 0, None
+        else:
+            last_uid, cached_modseq = state["last_uid"], state["highest_modseq"]
+
+        if last_uid:
+            if cached_modseq is None or highest_modseq is None:
+                self._sync_flags(mail, mailbox, uidvalidity, f"1:{last_uid}", "(FLAGS)")
+            elif highest_modseq != cached_modseq:
+                self._sync_flags(mail, mailbox, uidvalidity, f"1:{last_uid}", f"(FLAGS) (CHANGEDSINCE {cached_modseq})")
+
+        status, data = mail.uid("SEARCH", None, f"UID {last_uid + 1}:*")
+        new_uids = sorted(uid for uid in map(int, data[0].split()) if uid > last_uid)
+        if new_uids:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO messages (mailbox, uidvalidity, uid) VALUES (?, ?, ?)",
+                    [(mailbox, uidvalidity, uid) for uid in new_uids],
+                )
+            self.fetch_headers(mail, mailbox, new_uids[-EAGER_HEADER_LIMIT:])
+            if len(new_uids) > EAGER_HEADER_LIMIT:
+                self._sync_flags(mail, mailbox, uidvalidity, compress_uid_set(new_uids[:-EAGER_HEADER_LIMIT]), "(FLAGS)")
+            last_uid = new_uids[-1]
+
+        cached_count = self.conn.execute(
+            "SELECT COUNT(*) FROM messages WHERE mailbox = ? AND uidvalidity = ?", (mailbox, uidvalidity)
+        ).fetchone()[0]
+        if cached_count != exists:
+            server_uids = self.server_uids(mail)
+            cached_uids = self.conn.execute(
+                "SELECT uid FROM messages WHERE mailbox = ? AND uidvalidity = ?", (mailbox, uidvalidity)
+            )
+            expunged = []
+            for (uid,) in cached_uids:
+                position = bisect.bisect_left(server_uids, uid)
+                if position == len(server_uids) or server_uids[position] != uid:
+                    expunged.append((mailbox, uidvalidity, uid))
+            with self.conn:
+                self.conn.executemany(
+                    "DELETE FROM messages WHERE mailbox = ? AND uidvalidity = ? AND uid = ?", expunged
+                )
+
+        with self.conn:
+            self.conn.execute(
+                "UPDATE mailboxes SET last_uid = ?, highest_modseq = ? WHERE name = ?",
+                (last_uid, highest_modseq, mailbox),
+            )
+
+    def sync_index(self, mail, mailbox):
+        self.sync(mail, mailbox)
+        return self.ordered_uids(mail, mailbox)
+
+    def _sync_flags(self, mail, mailbox, uidvalidity, uid_range, fetch_items):
+        status, data = mail.uid("FETCH", uid_range, fetch_items)
+        changes = [
+            (response["flags"], mailbox, uidvalidity, response["uid"])
+            for response in parse_fetch_response(data)
+            if response["flags"] is not None
+        ]
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE messages SET flags = ? WHERE mailbox = ? AND uidvalidity = ? AND uid = ?", changes
+            )
+
+    def fetch_headers(self, mail, mailbox, uids):
+        uidvalidity = self.mailbox_state(mailbox)["uidvalidity"]
+        for start in range(0, len(uids), FETCH_BATCH_SIZE):
+            batch = uids[start:start + FETCH_BATCH_SIZE]
+            status, data = mail.uid("FETCH", ",".join(map(str, batch)), f"(UID FLAGS {HEADER_FIELDS})")
+
+            rows = []
+            for response in parse_fetch_response(data):
+                if response["literal"] is None:
+                    continue
+                headers = BytesParser().parsebytes(response["literal"], headersonly=True)
+                rows.append((
+                    headers.get("Message-ID", "").strip() or None,
+                    decode_header_value(headers.get("From"), "Unknown Sender"),
+                    decode_header_value(headers.get("Subject"), "No Subject"),
+                    parse_date(headers.get("Date")),
+                    response["flags"] or "",
+                    mailbox, uidvalidity, response["uid"],
+                ))
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE messages SET message_id = ?, sender = ?, subject = ?, date = ?, flags = ? "
+                    "WHERE mailbox = ? AND uidvalidity = ? AND uid = ?",
+                    rows,
+                )
+
+    def fetch_body(self, mail, mailbox, uid):
+        uidvalidity = self.mailbox_state(mailbox)["uidvalidity"]
+        status, data = mail.uid("FETCH", str(uid), f"(UID FLAGS BODYSTRUCTURE {HEADER_FIELDS})")
+        response = next((item for item in parse_fetch_response(data) if item["uid"] == uid), None)
+        if response is None or response["literal"] is None:
+            return self.message(mailbox, uid)
+
+        parts = body_parts(response["bodystructure"]) if response["bodystructure"] else []
+        text_part = choose_text_part(parts)
+        body = "No content"
+        if text_part is not None:
+            status, data = mail.uid("FETCH", str(uid), f"(UID BODY.PEEK[{text_part['section']}])")
+            content = next((item["literal"] for item in parse_fetch_response(data) if item["uid"] == uid), None)
+            if content:
+                body = decode_text_part(content, text_part) or "No content"
+        attachments = [part for part in parts if part["attachment"]]
+
+        headers = BytesParser().parsebytes(response["literal"], headersonly=True)
+        with self.conn:
+            self.conn.execute(
+                "UPDATE messages SET message_id = ?, sender = ?, subject = ?, date = ?, flags = ?, body = ?, attachments = ? "
+                "WHERE mailbox = ? AND uidvalidity = ? AND uid = ?",
+                (
+                    headers.get("Message-ID", "").strip() or None,
+                    decode_header_value(headers.get("From"), "Unknown Sender"),
+                    decode_header_value(headers.get("Subject"), "No Subject"),
+                    parse_date(headers.get("Date")),
+                    response["flags"] or "",
+                    body,
+                    json.dumps(attachments),
+                    mailbox, uidvalidity, uid,
+                ),
+            )
+        return self.message(mailbox, uid)
+
+    def download_attachment(self, mail, uid, attachment, file, chunk_size=ATTACHMENT_CHUNK_SIZE):
+        decoder = PartDecoder(attachment["encoding"])
+        offset = 0
+        while True:
+            status, data = mail.uid(
+                "FETCH", str(uid), f"(UID BODY.PEEK[{attachment['section']}]<{offset}.{chunk_size}>)"
+            )
+            chunk = next((item["literal"] for item in parse_fetch_response(data) if item["uid"] == uid), None) or b""
+            file.write(decoder.decode(chunk))
+            offset += len(chunk)
+            if len(chunk) < chunk_size:
+                break
+        file.write(decoder.flush())
+        return offset
+
+    def mark_seen(self, mail, mailbox, uid):
+        uidvalidity = self.mailbox_state(mailbox)["uidvalidity"]
+        status, data = mail.uid("STORE", str(uid), "+FLAGS.SILENT", "(\\Seen)")
+        if status == "OK":
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE messages SET flags = TRIM(flags || ' \\Seen') "
+                    "WHERE mailbox = ? AND uidvalidity = ? AND uid = ?",
+                    (mailbox, uidvalidity, uid),
+                )
@@ -1,21 +1,31 @@
 from rich.console import Console
 from rich.panel import Panel
 from rich.align import Align
+from concurrent.futures import Future
 from datetime import datetime
+import json
+import os
 import requests
 import signal
+import http_client
 import sys
+import threading
+from storage import write_atomic
 from email_service import EmailService
 from rss_service import RSSService
-from utils import fetch_7_day_weather, fetch_stock_data, show_top_stocks
+from utils import fetch_7_day_weather, fetch_forecast, fetch_stock_data, show_top_stocks
 from bot import chatbot_loop  
 
 console = Console()
 exit_requested = False  
 confirm_exit = False    
 
+LOCATION_CACHE_FILE = "location_cache.json"
+DEFAULT_LOCATION = {"city": "Unknown", "latitude": 40.7128, "longitude": -74.0060}
+
 email_service = EmailService()
 rss_service = RSSService()
+session = {"location": None, "weather": None, "weather_future": None, "pending": []}
 
 def handle_exit_signal(signal_received, frame):
     global confirm_exit
@@ -25,28 +35,91 @@ signal.signal(signal.SIGINT, handle_exit_signal)
 
 def get_location():
     try:
-        response = requests.get("https://ipinfo.io")
+        response = http_client.get("https://ipinfo.io")
         response.raise_for_status()
         data = response.json()
         location = data["loc"].split(",")
         city = data["city"]
         latitude, longitude = float(location[0]), float(location[1])
         return {"city": city, "latitude": latitude, "longitude": longitude}
-    except requests.exceptions.RequestException as e:
-        console.print(f"[red]Error fetching location: {e}[/red] 🌐")
-        return {"city": "Unknown", "latitude": 40.7128, "longitude": -74.0060}
+    except (requests.exceptions.RequestException, KeyError, ValueError):
+        return None
+
+def load_cached_location():
+    if os.path.exists(LOCATION_CACHE_FILE):
+        try:
+            with open(LOCATION_CACHE_FILE, "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+    return None
+
+def refresh_location():
+    location = get_location()
+    if location is not None:
+        try:
+            write_atomic(LOCATION_CACHE_FILE, json.dumps(location))
+        except OSError:
+            pass
+    return location
+
+def run_in_background(function, *args):
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(function(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+def same_place(first, second):
+    return (round(first["latitude"], 2), round(first["longitude"], 2)) == (round(second["latitude"], 2), round(second["longitude"], 2))
 
 def get_weather(latitude, longitude):
-    url = f"https://api.open-meteo.com/v1/forecast?latitude={latitude}&longitude={longitude}&current_weather=true"
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+        data = fetch_forecast(latitude, longitude, current_weather="true")
         weather = data["current_weather"]
         return f"{weather['temperature']}°C 🌡️"
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, KeyError) as e:
         return f"Error fetching weather data: {e} ☁️"
 
+def locate_and_fetch_weather(cached_location):
+    location = refresh_location() or cached_location or DEFAULT_LOCATION
+    if cached_location is not None and same_place(cached_location, location):
+        return location, None
+    return location, get_weather(location["latitude"], location["longitude"])
+
+def fetch_session_weather(location):
+    return None, get_weather(location["latitude"], location["longitude"])
+
+def collect_session_updates():
+    changed = False
+    for future in [future for future in session["pending"] if future.done()]:
+        if future not in session["pending"]:
+            continue
+        session["pending"].remove(future)
+        if future.exception() is not None:
+            continue
+        location, weather = future.result()
+        if location is not None and location != session["location"]:
+            if session["weather_future"] in session["pending"] and not same_place(session["location"], location):
+                session["pending"].remove(session["weather_future"])
+            session["location"] = location
+            changed = True
+        if weather is not None and weather != session["weather"]:
+            session["weather"] = weather
+            changed = True
+    return changed
+
+def display_session_updates():
+    if collect_session_updates():
+        city = session["location"]["city"] if session["location"] else "Locating... 🌐"
+        weather = session["weather"] or "Loading... ☁️"
+        console.print(f"[bold cyan]📍  Location:[/bold cyan] {city} [bold cyan]|[/bold cyan] [bold cyan]🌤️   Weather:[/bold cyan] {weather}")
+
 def display_initial_layout():
     welcome_message = Panel(
         Align.center("[bold magenta]🌟  Welcome to Consolia 🌟[/bold magenta]\n[italic cyan] Your Terminal Workspace[/italic cyan]"),
@@ -58,11 +131,16 @@ def display_initial_layout():
 
     now = datetime.now()
     date_str = now.strftime("%A, %B %d, %Y - %H:%M")
-    location_data = get_location()
-    city = location_data["city"]
-    latitude, longitude = location_data["latitude"], location_data["longitude"]
-    weather_info = get_weather(latitude, longitude)
+    location = load_cached_location()
+    session["location"] = location
+    session["pending"].append(run_in_background(locate_and_fetch_weather, location))
+    if location is not None:
+        session["weather_future"] = run_in_background(fetch_session_weather, location)
+        session["pending"].append(session["weather_future"])
+    collect_session_updates()
 
+    city = session["location"]["city"] if session["location"] else "Locating... 🌐"
+    weather_info = session["weather"] or "Loading... ☁️"
     console.print("\n[bold cyan]🌍  Current Session Details[/bold cyan]", style="bold underline")
     console.print(f"[bold]📅  Date:[/bold] {date_str}")
     console.print(f"[bold]📍  Location:[/bold] {city}")
@@ -70,6 +148,7 @@ def display_initial_layout():
     console.print("[bold green]=============================================[/bold green]")
 
 def display_options_menu():
+    display_session_updates()
     console.print("\n[bold yellow]🛠️   Options Menu:[/bold yellow]", style="bold underline")
     
     if not email_service.is_logged_in:
@@ -80,10 +159,15 @@ def display_options_menu():
         console.print("[bold green]5.[/bold green] ☁️   7-Day Weather Forecast")
         console.print("[bold green]6.[/bold green] 🚪  Exit")
     else:
-        console.print("[bold green]1.[/bold green] 📧  Check Email")
+        for notification in email_service.pop_notifications():
+            console.print(f"[bold magenta]{notification}[/bold magenta]")
+        unread = f" ({email_service.unread_count} unread)" if email_service.unread_count else ""
+        console.print(f"[bold green]1.[/bold green] 📧  Check Email{unread}")
         console.print("[bold green]2.[/bold green] ✉️   Send Email")
         console.print("[bold green]3.[/bold green] 🖊️   Set Email Signature")  
         console.print("[bold green]4.[/bold green] 🔒  Logout")
+        console.print("[bold green]5.[/bold green] 🗂️   All Mailboxes")
+        console.print("[bold green]6.[/bold green] ➕  Add Account")
 
     console.print("[bold green]=============================================[/bold green]")
 
@@ -126,6 +210,7 @@ def weather_option():
 def main():
     global exit_requested, confirm_exit
     display_initial_layout()  
+    rss_service.start_background_refresh()
 
     while True:
         try:
@@ -168,11 +253,17 @@ def handle_option(option):
             stock_option()  
         else:
             email_service.logout()  
-    elif option == '5' and not email_service.is_logged_in:
-        weather_option()  
-    elif option == '6' and not email_service.is_logged_in:
-        console.print("[bold red]Exiting program...[/bold red] 👋")
-        sys.exit(0)
+    elif option == '5':
+        if not email_service.is_logged_in:
+            weather_option()  
+        else:
+            email_service.display_unified_inbox()
+    elif option == '6':
+        if not email_service.is_logged_in:
+            console.print("[bold red]Exiting program...[/bold red] 👋")
+            sys.exit(0)
+        else:
+            email_service.add_account()
     else:
         console.print("[red]Invalid option! Please select a valid option.[/red] 🚫")
 
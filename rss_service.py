@@ -1,17 +1,229 @@
+import calendar
 import feedparser
 import json
 import os
+import random
+import threading
+import time
+import http_client
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from xml.etree import ElementTree
+from feed_store import FeedStore, MAX_ENTRIES_PER_FEED
+from storage import JournaledStore, write_atomic
 from rich.console import Console
 from rich.panel import Panel
 from rich import box
 
+MAX_FETCH_WORKERS = 16
+PER_HOST_LIMIT = 2
+MAX_BACKGROUND_REFRESHES = 4
+SCHEDULER_POLL_INTERVAL = 30
+MIN_REFRESH_INTERVAL = 5 * 60
+DEFAULT_REFRESH_INTERVAL = 60 * 60
+MAX_REFRESH_INTERVAL = 24 * 60 * 60
+REFRESH_JITTER = 0.1
+STREAM_CHUNK_SIZE = 64 * 1024
+FEED_ROOTS = {"rss", "RDF", "feed"}
+CHANNEL_FIELDS = {"ttl": "ttl", "updatePeriod": "sy_updateperiod", "updateFrequency": "sy_updatefrequency"}
+UPDATE_PERIODS = {
+    "hourly": 60 * 60,
+    "daily": 24 * 60 * 60,
+    "weekly": 7 * 24 * 60 * 60,
+    "monthly": 30 * 24 * 60 * 60,
+    "yearly": 365 * 24 * 60 * 60,
+}
+
+
+def entry_timestamp(entry):
+    published = entry.get("published_parsed") or entry.get("updated_parsed")
+    return calendar.timegm(published) if published else 0
+
+
+def declared_interval(channel):
+    ttl = str(channel.get("ttl") or "").strip()
+    if ttl.isascii() and ttl.isdigit():
+        return int(ttl) * 60
+    period = UPDATE_PERIODS.get(str(channel.get("sy_updateperiod") or "").strip().lower())
+    if period is None:
+        return None
+    frequency = str(channel.get("sy_updatefrequency") or "1").strip()
+    return period / max(1, int(frequency)) if frequency.isascii() and frequency.isdigit() else period
+
+
+def observed_interval(published):
+    if len(published) < 2:
+        return None
+    return (published[0] - published[-1]) / (len(published) - 1)
+
+
+def jittered(interval):
+    return interval * random.uniform(1 - REFRESH_JITTER, 1 + REFRESH_JITTER)
+
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_timestamp(value):
+    if not value:
+        return 0
+    try:
+        return int(parsedate_to_datetime(value).timestamp())
+    except (TypeError, ValueError, IndexError):
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return 0
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def stream_entry(element):
+    fields = {}
+    link = None
+    for child in element:
+        name = local_name(child.tag)
+        if name == "link":
+            href = child.get("href")
+            if href and child.get("rel", "alternate") == "alternate":
+                link = link or href
+            elif not href and child.text:
+                link = link or child.text.strip()
+        else:
+            fields.setdefault(name, "".join(child.itertext()).strip() or None)
+    return {
+        "id": fields.get("guid") or fields.get("id"),
+        "title": fields.get("title"),
+        "link": link,
+        "summary": fields.get("description") or fields.get("summary") or fields.get("encoded") or fields.get("content"),
+        "published": parse_timestamp(
+            fields.get("pubDate") or fields.get("published") or fields.get("updated") or fields.get("date")
+        ),
+    }
+
+
+def stream_feed(chunks, limit):
+    parser = ElementTree.XMLPullParser(events=("start", "end"))
+    path = []
+    entries = []
+    channel = {}
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == "start":
+                if not path and local_name(element.tag) not in FEED_ROOTS:
+                    raise ValueError(f"Unsupported feed format: {element.tag}")
+                path.append(element)
+                continue
+            path.pop()
+            name = local_name(element.tag)
+            if name in ("item", "entry"):
+                entries.append(stream_entry(element))
+                if path:
+                    path[-1].remove(element)
+                if len(entries) >= limit:
+                    return entries, channel
+            elif name in CHANNEL_FIELDS and path and local_name(path[-1].tag) in ("channel", "feed"):
+                channel[CHANNEL_FIELDS[name]] = (element.text or "").strip()
+    parser.close()
+    return entries, channel
+
+
+def parse_opml(path):
+    outlines = []
+    for outline in ElementTree.parse(path).iter("outline"):
+        url = (outline.get("xmlUrl") or "").strip()
+        if url:
+            outlines.append(((outline.get("title") or outline.get("text") or url).strip(), url))
+    return outlines
+
+
+def build_opml(feeds):
+    opml = ElementTree.Element("opml", version="2.0")
+    head = ElementTree.SubElement(opml, "head")
+    ElementTree.SubElement(head, "title").text = "Consolia RSS Feeds"
+    body = ElementTree.SubElement(opml, "body")
+    for name, url in feeds.items():
+        ElementTree.SubElement(body, "outline", type="rss", text=name, title=name, xmlUrl=url)
+    ElementTree.indent(opml)
+    return '<?xml version="1.0" encoding="UTF-8"?>\n' + ElementTree.tostring(opml, encoding="unicode") + "\n"
+
+
+def favorite_key(entry):
+    return entry.get("link") or entry.get("id") or entry.get("title")
+
+
+def entry_record(entry):
+    return {
+        "id": entry.get("id"),
+        "title": entry.get("title"),
+        "link": entry.get("link"),
+        "summary": entry.get("summary"),
+        "published": entry_timestamp(entry),
+    }
+
+
+class FeedScheduler:
+    def __init__(self, service, cache_file, max_workers=MAX_BACKGROUND_REFRESHES, poll_interval=SCHEDULER_POLL_INTERVAL):
+        self.service = service
+        self.cache_file = cache_file
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        store = FeedStore(self.cache_file)
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                while not self.stop_event.is_set():
+                    try:
+                        self._refresh_due(executor, store)
+                    except Exception:
+                        pass
+                    self.stop_event.wait(self.poll_interval)
+        finally:
+            store.close()
+
+    def _refresh_due(self, executor, store):
+        due = store.due_feeds(self.service.feed_urls(), time.time())
+        futures = {executor.submit(self.service.download_feed, url, *store.validators(url)): url for url in due}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                self.service.store_feed(url, future.result(), store)
+            except Exception:
+                try:
+                    self.service.record_failure(url, store)
+                except Exception:
+                    pass
+
+
 class RSSService:
-    def __init__(self, storage_file="rss_feeds.json"):
+    def __init__(self, storage_file="rss_feeds.json", cache_file="rss_cache.db", entry_limit=MAX_ENTRIES_PER_FEED):
         self.console = Console()
         self.storage_file = storage_file
         self.favorites_file = "rss_favorites.json"  
         self.feeds = self.load_feeds()
         self.favorites = self.load_favorites()
+        self.feed_store = FeedStore(cache_file)
+        self.feed_store.index_favorites(self.favorites.items())
+        self.entry_limit = entry_limit
+        self.host_limits = {}
+        self.host_limits_lock = threading.Lock()
+        self.scheduler = None
 
     def load_feeds(self):
         if os.path.exists(self.storage_file):
@@ -29,80 +241,208 @@ class RSSService:
         }
 
     def load_favorites(self):
-        if os.path.exists(self.favorites_file):
-            with open(self.favorites_file, "r") as file:
-                return json.load(file)
-        return []
+        return JournaledStore(self.favorites_file, legacy_key=favorite_key)
 
     def save_feeds(self):
-        with open(self.storage_file, "w") as file:
-            json.dump(self.feeds, file, indent=4)
+        write_atomic(self.storage_file, json.dumps(self.feeds, indent=4))
+
+    def download_feed(self, url, etag=None, modified=None):
+        request_headers = {}
+        if etag:
+            request_headers["If-None-Match"] = etag
+        if modified:
+            request_headers["If-Modified-Since"] = modified
+        host = urlparse(url).netloc
+        with self.host_limits_lock:
+            limit = self.host_limits.setdefault(host, threading.Semaphore(PER_HOST_LIMIT))
+        with limit:
+            with http_client.get(url, headers=request_headers, stream=True) as response:
+                if response.status_code == 304:
+                    return None, etag, modified, None
+                response.raise_for_status()
+                headers = {key.lower(): value for key, value in response.headers.items()}
+                try:
+                    entries, channel = stream_feed(response.iter_content(STREAM_CHUNK_SIZE), self.entry_limit)
+                except (ElementTree.ParseError, ValueError):
+                    entries = None
+            if entries is None:
+                response = http_client.get(url)
+                response.raise_for_status()
+                feed = feedparser.parse(response.content, response_headers=headers)
+                entries = [entry_record(entry) for entry in feed.entries[:self.entry_limit]]
+                channel = feed.feed
+        return entries, headers.get("etag"), headers.get("last-modified"), declared_interval(channel)
+
+    def store_feed(self, url, result, store=None):
+        store = store or self.feed_store
+        entries, etag, modified, declared = result
+        if entries is None:
+            store.touch(url)
+        else:
+            store.save(url, etag, modified, entries, declared)
+        interval = observed_interval(store.recent_published(url)) or DEFAULT_REFRESH_INTERVAL
+        state = store.refresh_state(url)
+        if state["declared_interval"]:
+            interval = max(interval, state["declared_interval"])
+        interval = min(max(interval, MIN_REFRESH_INTERVAL), MAX_REFRESH_INTERVAL)
+        store.schedule(url, interval, time.time() + jittered(interval), 0)
+
+    def record_failure(self, url, store=None):
+        store = store or self.feed_store
+        state = store.refresh_state(url)
+        interval = state["interval"] if state is not None else None
+        failures = (state["failures"] if state is not None else 0) + 1
+        delay = min(MIN_REFRESH_INTERVAL * 2 ** failures, MAX_REFRESH_INTERVAL)
+        store.schedule(url, interval, time.time() + jittered(delay), failures)
+
+    def feed_urls(self):
+        return list({**self.feeds["suggested"], **self.feeds["custom"]}.values())
+
+    def start_background_refresh(self):
+        if self.scheduler is None:
+            self.scheduler = FeedScheduler(self, self.feed_store.path)
+            self.scheduler.start()
 
-    def save_favorites(self):
-        with open(self.favorites_file, "w") as file:
-            json.dump(self.favorites, file, indent=4)
+    def stop_background_refresh(self):
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler = None
+
+    def refresh_feed(self, url):
+        self.store_feed(url, self.download_feed(url, *self.feed_store.validators(url)))
+
+    def refresh_all_feeds(self, all_feeds):
+        failures = []
+        with ThreadPoolExecutor(max_workers=max(1, min(MAX_FETCH_WORKERS, len(all_feeds)))) as executor:
+            futures = {
+                executor.submit(self.download_feed, url, *self.feed_store.validators(url)): (name, url)
+                for name, url in all_feeds.items()
+            }
+            for future in as_completed(futures):
+                name, url = futures[future]
+                try:
+                    self.store_feed(url, future.result())
+                except Exception:
+                    self.record_failure(url)
+                    failures.append(name)
+        return failures
 
     def display_feed(self, url):
-        self.console.print(f"[blue]Fetching RSS feed from: {url}[/blue]")
-        feed = feedparser.parse(url)
-
-        if feed.entries:
-            page = 0
-            page_size = 5
-            while True:
-                start = page * page_size
-                end = start + page_size
-                entries = feed.entries[start:end]
-
-                total_pages = (len(feed.entries) - 1) // page_size + 1
-                self.console.print(f"[bold cyan]RSS Entries (Page {page + 1}/{total_pages}):[/bold cyan]")
-                for i, entry in enumerate(entries, start=1):
-                    self.console.print(Panel(
-                        f"[bold green]{i + start}. Title:[/bold green] {entry.title}\n"
-                        f"[cyan]Link:[/cyan] {entry.link}",
-                        title="📰 RSS Entry Summary",
-                        border_style="green",
-                        box=box.ROUNDED
-                    ))
-
-                self.console.print("\n[bold yellow]Commands:[/bold yellow] [blue]next[/blue] | [blue]prev[/blue] | [blue]read <number>[/blue] | [blue]go <page>[/blue] | [blue]exit[/blue]")
-                command = self.console.input("\nEnter command: ").strip().lower()
-
-                if command == "next":
-                    if end < len(feed.entries):
-                        page += 1
-                    else:
-                        self.console.print("[red]No more pages.[/red]")
-                elif command == "prev":
-                    if page > 0:
-                        page -= 1
-                    else:
-                        self.console.print("[red]No previous pages.[/red]")
-                elif command.startswith("go "):
-                    try:
-                        go_to_page = int(command.split(" ")[1]) - 1
-                        if 0 <= go_to_page < total_pages:
-                            page = go_to_page
-                        else:
-                            self.console.print("[red]Invalid page number.[/red]")
-                    except ValueError:
-                        self.console.print("[red]Invalid page number.[/red]")
-                elif command.startswith("read "):
-                    try:
-                        entry_index = int(command.split(" ")[1]) - 1
-                        if 0 <= entry_index < len(feed.entries):
-                            self.display_full_entry(feed.entries[entry_index])
-                        else:
-                            self.console.print("[red]Invalid selection. Please choose a valid number.[/red]")
-                    except (IndexError, ValueError):
-                        self.console.print("[red]Invalid command. Use 'read <number>' to view an entry.[/red]")
-                elif command == "exit":
-                    break
-                else:
-                    self.console.print("[red]Invalid command.[/red]")
+        if not self.feed_store.has_feed(url):
+            self.console.print(f"[blue]Fetching RSS feed from: {url}[/blue]")
+            try:
+                self.refresh_feed(url)
+            except Exception as e:
+                self.record_failure(url)
+                self.console.print(f"[red]Unable to fetch the feed:[/red] {str(e)}")
+                return
+
+        total = self.feed_store.count(url)
+        if total:
+            self.display_entries(
+                "RSS Entries", total, lambda offset, limit: self.feed_store.page(url, offset, limit)
+            )
+            self.feed_store.mark_visited(url)
         else:
             self.console.print("[red]No entries found or unable to fetch the feed.[/red]")
 
+    def display_timeline(self):
+        all_feeds = {**self.feeds["suggested"], **self.feeds["custom"]}
+        with self.console.status("📡  Refreshing all feeds...", spinner="dots"):
+            failures = self.refresh_all_feeds(all_feeds)
+        if failures:
+            self.console.print(f"[yellow]Could not refresh: {', '.join(sorted(failures))}[/yellow]")
+
+        names = {url: name for name, url in all_feeds.items()}
+        urls = list(names)
+        total = self.feed_store.timeline_count(urls) if urls else 0
+        if total:
+            self.display_entries(
+                "All Feeds", total, lambda offset, limit: self.feed_store.timeline_page(urls, offset, limit), names
+            )
+            for url in urls:
+                self.feed_store.mark_visited(url)
+        else:
+            self.console.print("[red]No entries found or unable to fetch the feeds.[/red]")
+
+    def display_search_results(self, query, all_feeds):
+        if not query:
+            self.console.print("[red]Invalid command. Use 'search <query>' to find entries.[/red]")
+            return
+        results = self.feed_store.search(query)
+        if not results:
+            self.console.print(f"[yellow]No entries found matching '{query}'.[/yellow]")
+            return
+        self.console.print(f"[green]Found {len(results)} entries matching '{query}'.[/green]")
+        names = {url: name for name, url in all_feeds.items()}
+        self.display_entries(
+            f"Search Results for '{query}'", len(results), lambda offset, limit: results[offset:offset + limit], names
+        )
+
+    def display_entries(self, heading, total, load_page, sources=None):
+        page = 0
+        page_size = 5
+        total_pages = (total - 1) // page_size + 1
+        while True:
+            start = page * page_size
+            end = start + page_size
+            entries = load_page(start, page_size)
+
+            self.console.print(f"[bold cyan]{heading} (Page {page + 1}/{total_pages}):[/bold cyan]")
+            for i, entry in enumerate(entries, start=1):
+                source = ""
+                if sources is not None:
+                    source_name = sources.get(entry["feed"], entry["feed"]) if entry["feed"] else "⭐ Favorites"
+                    source = f"\n[magenta]Feed:[/magenta] {source_name}"
+                self.console.print(Panel(
+                    f"[bold green]{i + start}. Title:[/bold green] {entry.get('title')}\n"
+                    f"[cyan]Link:[/cyan] {entry.get('link')}{source}",
+                    title="📰 RSS Entry Summary" if entry["read"] else "📰 RSS Entry Summary (unread)",
+                    border_style="green",
+                    box=box.ROUNDED
+                ))
+
+            self.console.print("\n[bold yellow]Commands:[/bold yellow] [blue]next[/blue] | [blue]prev[/blue] | [blue]read <number>[/blue] | [blue]go <page>[/blue] | [blue]exit[/blue]")
+            command = self.console.input("\nEnter command: ").strip().lower()
+
+            if command == "next":
+                if end < total:
+                    page += 1
+                else:
+                    self.console.print("[red]No more pages.[/red]")
+            elif command == "prev":
+                if page > 0:
+                    page -= 1
+                else:
+                    self.console.print("[red]No previous pages.[/red]")
+            elif command.startswith("go "):
+                try:
+                    go_to_page = int(command.split(" ")[1]) - 1
+                    if 0 <= go_to_page < total_pages:
+                        page = go_to_page
+                    else:
+                        self.console.print("[red]Invalid page number.[/red]")
+                except ValueError:
+                    self.console.print("[red]Invalid page number.[/red]")
+            elif command.startswith("read "):
+                try:
+                    entry_index = int(command.split(" ")[1]) - 1
+                    selected = load_page(entry_index, 1) if 0 <= entry_index < total else []
+                    if selected:
+                        entry = selected[0]
+                        if entry["feed"] is not None:
+                            entry["summary"] = self.feed_store.summary(entry["feed"], entry["key"])
+                            self.feed_store.mark_read(entry["feed"], entry["key"])
+                        self.display_full_entry(entry)
+                    else:
+                        self.console.print("[red]Invalid selection. Please choose a valid number.[/red]")
+                except (IndexError, ValueError):
+                    self.console.print("[red]Invalid command. Use 'read <number>' to view an entry.[/red]")
+            elif command == "exit":
+                break
+            else:
+                self.console.print("[red]Invalid command.[/red]")
+
     def display_full_entry(self, entry, is_favorite=False):
         self.console.print(Panel(
             f"[bold green]Title:[/bold green] {entry.get('title')}\n"
@@ -121,31 +461,95 @@ class RSSService:
         command = self.console.input("\nEnter command: ").strip().lower()
 
         if command == "favorite" and not is_favorite:
-            if not any(fav['link'] == entry['link'] for fav in self.favorites):
-                self.favorites.append({
+            key = favorite_key(entry)
+            if key not in self.favorites:
+                favorite = {
                     "title": entry.get("title"),
                     "link": entry.get("link"),
                     "summary": entry.get("summary")
-                })
-                self.save_favorites()
+                }
+                self.favorites.put(key, favorite)
+                self.feed_store.add_favorite(key, favorite)
                 self.console.print("[green]Added to favorites![/green]")
             else:
                 self.console.print("[yellow]Already in favorites.[/yellow]")
             self.display_full_entry(entry, is_favorite=True)
         elif command == "remove favorite" and is_favorite:
-            self.favorites = [fav for fav in self.favorites if fav['link'] != entry['link']]
-            self.save_favorites()
+            self.favorites.delete(favorite_key(entry))
+            self.feed_store.remove_favorite(favorite_key(entry))
             self.console.print("[green]Removed from favorites![/green]")
 
+    def validate_feeds(self, candidates):
+        valid = set()
+        with ThreadPoolExecutor(max_workers=max(1, min(MAX_FETCH_WORKERS, len(candidates)))) as executor:
+            futures = {executor.submit(self.download_feed, url): url for url in candidates}
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    result = future.result()
+                    if result[0]:
+                        self.store_feed(url, result)
+                        valid.add(url)
+                except Exception:
+                    continue
+        return valid
+
+    def import_opml(self, path):
+        try:
+            outlines = parse_opml(path)
+        except (OSError, ElementTree.ParseError) as e:
+            self.console.print(f"[red]Unable to read OPML file:[/red] {str(e)}")
+            return
+
+        subscribed = set(self.feed_urls())
+        candidates = {}
+        for name, url in outlines:
+            if url not in subscribed:
+                candidates.setdefault(url, name)
+        if not candidates:
+            self.console.print("[yellow]No new feeds found in the OPML file.[/yellow]")
+            return
+
+        with self.console.status(f"🔎  Validating {len(candidates)} feeds...", spinner="dots"):
+            valid = self.validate_feeds(candidates)
+
+        names = set(self.feeds["suggested"]) | set(self.feeds["custom"])
+        for url, name in candidates.items():
+            if url not in valid:
+                continue
+            unique_name, suffix = name, 2
+            while unique_name in names:
+                unique_name, suffix = f"{name} ({suffix})", suffix + 1
+            names.add(unique_name)
+            self.feeds["custom"][unique_name] = url
+        if valid:
+            self.save_feeds()
+        self.console.print(f"[green]Imported {len(valid)} RSS feed(s).[/green]")
+        failed = [name for url, name in candidates.items() if url not in valid]
+        if failed:
+            self.console.print(f"[yellow]Skipped {len(failed)} feed(s) that could not be fetched or had no entries: {', '.join(failed[:10])}{' ...' if len(failed) > 10 else ''}[/yellow]")
+
+    def export_opml(self, path):
+        try:
+            write_atomic(path, build_opml({**self.feeds["suggested"], **self.feeds["custom"]}))
+        except OSError as e:
+            self.console.print(f"[red]Unable to write OPML file:[/red] {str(e)}")
+            return
+        self.console.print(f"[green]Exported RSS feeds to {path}.[/green]")
+
     def display_all_feeds(self):
         while True:
             self.console.print("\n[bold cyan]Available RSS Feeds:[/bold cyan]")
             all_feeds = {**self.feeds["suggested"], **self.feeds["custom"]}
+            new_counts = self.feed_store.new_counts()
             for i, (name, url) in enumerate(all_feeds.items(), 1):
-                self.console.print(f"[bold green]{i}.[/bold green] {name} - {url}")
+                new_count = new_counts.get(url)
+                badge = f" [yellow]({new_count} new)[/yellow]" if new_count else ""
+                self.console.print(f"[bold green]{i}.[/bold green] {name} - {url}{badge}")
 
-            self.console.print("\n[bold yellow]Commands:[/bold yellow] [blue]view <number>[/blue] | [blue]add[/blue] | [blue]edit <number>[/blue] | [blue]delete <number>[/blue] | [blue]favorites[/blue] | [blue]exit[/blue]")
-            command = self.console.input("\nEnter command: ").strip().lower()
+            self.console.print("\n[bold yellow]Commands:[/bold yellow] [blue]view <number>[/blue] | [blue]refresh all[/blue] | [blue]search <query>[/blue] | [blue]add[/blue] | [blue]edit <number>[/blue] | [blue]delete <number>[/blue] | [blue]import <file>[/blue] | [blue]export <file>[/blue] | [blue]favorites[/blue] | [blue]exit[/blue]")
+            raw_command = self.console.input("\nEnter command: ").strip()
+            command = raw_command.lower()
 
             if command.startswith("view "):
                 try:
@@ -155,6 +559,18 @@ class RSSService:
                 except (IndexError, ValueError):
                     self.console.print("[red]Invalid selection. Please choose a valid number.[/red]")
 
+            elif command == "refresh all":
+                self.display_timeline()
+
+            elif command.startswith("search "):
+                self.display_search_results(command[len("search "):].strip(), all_feeds)
+
+            elif command.startswith("import "):
+                self.import_opml(raw_command[len("import "):].strip())
+
+            elif command.startswith("export "):
+                self.export_opml(raw_command[len("export "):].strip())
+
             elif command == "add":
                 name = self.console.input("Enter name for the new RSS feed: ").strip()
                 url = self.console.input("Enter RSS feed URL: ").strip()
@@ -209,11 +625,12 @@ class RSSService:
 
         page = 0
         page_size = 5
-        total_pages = (len(self.favorites) - 1) // page_size + 1
-        while True:
+        while self.favorites:
+            total_pages = (len(self.favorites) - 1) // page_size + 1
+            page = min(page, total_pages - 1)
             start = page * page_size
             end = start + page_size
-            entries = self.favorites[start:end]
+            entries = self.favorites.page(start, end)
 
             self.console.print(f"[bold cyan]Favorite Entries (Page {page + 1}/{total_pages}):[/bold cyan]")
             for i, entry in enumerate(entries, start=1):
@@ -260,8 +677,9 @@ class RSSService:
                 try:
                     index = int(command.split(" ")[1]) - 1
                     if 0 <= index < len(entries):
-                        removed = self.favorites.pop(start + index)
-                        self.save_favorites()
+                        removed = entries[index]
+                        self.favorites.delete(favorite_key(removed))
+                        self.feed_store.remove_favorite(favorite_key(removed))
                         self.console.print(f"[green]Removed '{removed['title']}' from favorites.[/green]")
                     else:
                         self.console.print("[red]Invalid selection. Choose a valid favorite to remove.[/red]")
@@ -0,0 +1,108 @@
+import itertools
+import json
+import os
+
+
+def write_atomic(path, content):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        file.write(content)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def fts_query(query):
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in query.split())
+
+
+class JournaledStore:
+    def __init__(self, path, legacy_key=None, compact_threshold=1000):
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.compact_threshold = compact_threshold
+        self.entries = {}
+        self.journal_size = 0
+        self.journal = None
+        self.load(legacy_key)
+
+    def load(self, legacy_key):
+        migrated = False
+        if os.path.exists(self.path):
+            with open(self.path, "r") as file:
+                data = json.load(file)
+            if isinstance(data, list):
+                data = {legacy_key(entry): entry for entry in data}
+                migrated = True
+            self.entries = data
+
+        if os.path.exists(self.journal_path):
+            valid_size = 0
+            with open(self.journal_path, "rb") as file:
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    self._apply(record)
+                    self.journal_size += 1
+                    valid_size += len(line)
+            with open(self.journal_path, "r+b") as file:
+                file.truncate(valid_size)
+
+        self.journal = open(self.journal_path, "a")
+        if migrated:
+            self.compact()
+
+    def _apply(self, record):
+        if record["op"] == "put":
+            self.entries[record["key"]] = record["value"]
+        else:
+            self.entries.pop(record["key"], None)
+
+    def _append(self, record):
+        self.journal.write(json.dumps(record) + "\n")
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        self._apply(record)
+        self.journal_size += 1
+        if self.journal_size >= max(self.compact_threshold, len(self.entries)):
+            self.compact()
+
+    def put(self, key, value):
+        self._append({"op": "put", "key": key, "value": value})
+
+    def delete(self, key):
+        if key in self.entries:
+            self._append({"op": "delete", "key": key})
+
+    def compact(self):
+        write_atomic(self.path, json.dumps(self.entries))
+        self.journal.close()
+        self.journal = open(self.journal_path, "w")
+        self.journal_size = 0
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def get(self, key, default=None):
+        return self.entries.get(key, default)
+
+    def values(self):
+        return list(self.entries.values())
+
+    def items(self):
+        return list(self.entries.items())
+
+    def page(self, start, end):
+        return list(itertools.islice(self.entries.values(), start, end))
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
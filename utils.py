@@ -1,31 +1,112 @@
 import os
+import time
 import requests
+import http_client
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as clock, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from yahooquery import Ticker
 from rich.console import Console
-from rich.progress import Progress
+from cache import LRUCache, TTLCache
 
 console = Console()
 
 TOP_STOCKS = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "FB", "BRK.B", "V", "JNJ", "WMT"]
+QUOTE_BATCH_SIZE = 100
+MAX_QUOTE_WORKERS = 4
+MARKET_HOURS_QUOTE_TTL = 60
+AFTER_HOURS_QUOTE_TTL = 15 * 60
+QUOTE_MAX_STALE = 15 * 60
+MARKET_OPEN = clock(9, 30)
+MARKET_CLOSE = clock(16, 0)
+
+try:
+    MARKET_TIMEZONE = ZoneInfo("America/New_York")
+except ZoneInfoNotFoundError:
+    MARKET_TIMEZONE = timezone(timedelta(hours=-5))
+
+def quote_ttl():
+    now = datetime.now(MARKET_TIMEZONE)
+    if now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE:
+        return MARKET_HOURS_QUOTE_TTL
+    return AFTER_HOURS_QUOTE_TTL
+
+quote_cache = TTLCache(quote_ttl, path="quote_cache.json", max_stale=QUOTE_MAX_STALE)
+
+GEOCODE_CACHE_SIZE = 500
+COMMON_CITIES = {
+    "new york": {"latitude": 40.71427, "longitude": -74.00597},
+    "london": {"latitude": 51.50853, "longitude": -0.12574},
+    "paris": {"latitude": 48.85341, "longitude": 2.3488},
+    "tokyo": {"latitude": 35.6895, "longitude": 139.69171},
+    "berlin": {"latitude": 52.52437, "longitude": 13.41053},
+    "los angeles": {"latitude": 34.05223, "longitude": -118.24368},
+    "chicago": {"latitude": 41.85003, "longitude": -87.65005},
+    "toronto": {"latitude": 43.70011, "longitude": -79.4163},
+    "sydney": {"latitude": -33.86785, "longitude": 151.20732},
+    "mumbai": {"latitude": 19.07283, "longitude": 72.88261},
+}
+
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+FORECAST_MAX_STALE = 3 * 60 * 60
+COORDINATE_PRECISION = 2
+
+def seconds_until_next_hour():
+    return 60 * 60 - time.time() % (60 * 60)
+
+forecast_cache = TTLCache(seconds_until_next_hour, path="forecast_cache.json", max_stale=FORECAST_MAX_STALE)
+
+def fetch_forecast(latitude, longitude, **variables):
+    params = {
+        "latitude": round(latitude, COORDINATE_PRECISION),
+        "longitude": round(longitude, COORDINATE_PRECISION),
+        **variables,
+    }
+    key = "&".join(f"{name}={value}" for name, value in sorted(params.items()))
+
+    def load():
+        response = http_client.get(FORECAST_URL, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    return forecast_cache.get(key, load)
+
+geocode_cache = LRUCache(GEOCODE_CACHE_SIZE, path="geocode_cache.json")
+geocode_cache.preload(COMMON_CITIES)
+
+def normalize_city(city):
+    return " ".join(city.split()).casefold()
+
+def geocode_city(city):
+    key = normalize_city(city)
+    location = geocode_cache.get(key)
+    if location is None:
+        location_url = f"https://geocoding-api.open-meteo.com/v1/search?name={city}&count=1"
+        location_response = http_client.get(location_url)
+        location_response.raise_for_status()
+        results = location_response.json().get("results")
+        if not results:
+            return None
+        location = {"latitude": results[0]["latitude"], "longitude": results[0]["longitude"]}
+        geocode_cache.put(key, location)
+    return location
 
 def fetch_7_day_weather(city):
     console.print(f"\n🌦️ [bold cyan]Fetching weather for {city}...[/bold cyan]")
     try:
-        location_url = f"https://geocoding-api.open-meteo.com/v1/search?name={city}"
-        location_response = requests.get(location_url)
-        location_response.raise_for_status()
-        location_data = location_response.json()
-
-        if not location_data.get("results"):
+        location = geocode_city(city)
+        if location is None:
             return f"No results found for city: {city}"
 
-        latitude = location_data["results"][0]["latitude"]
-        longitude = location_data["results"][0]["longitude"]
+        latitude = location["latitude"]
+        longitude = location["longitude"]
 
-        weather_url = f"https://api.open-meteo.com/v1/forecast?latitude={latitude}&longitude={longitude}&daily=temperature_2m_min,temperature_2m_max,windspeed_10m_max,weathercode&timezone=auto"
-        weather_response = requests.get(weather_url)
-        weather_response.raise_for_status()
-        weather_data = weather_response.json()
+        weather_data = fetch_forecast(
+            latitude,
+            longitude,
+            daily="temperature_2m_min,temperature_2m_max,windspeed_10m_max,weathercode",
+            timezone="auto",
+        )
 
         weather_icons = {"sun": "☀️", "cloud": "☁️", "rain": "🌧️", "snow": "❄️", "wind": "💨"}
 
@@ -58,7 +139,7 @@ def fetch_news(topic):
     api_key = os.getenv("NEWS_API_KEY")
     url = f"https://newsapi.org/v2/everything?q={topic}&language=en&pageSize=5&apiKey={api_key}"
     try:
-        response = requests.get(url)
+        response = http_client.get(url)
         response.raise_for_status()
         articles = response.json().get("articles", [])
         news = ""
@@ -72,8 +153,7 @@ def fetch_news(topic):
 def fetch_stock_data(symbol):
     try:
         console.print(f"\n🔍 [bold cyan]Searching for {symbol} stock data...[/bold cyan]")
-        ticker = Ticker(symbol)
-        stock_info = ticker.summary_detail.get(symbol)
+        stock_info = quote_cache.get(symbol.upper(), lambda: Ticker(symbol).summary_detail.get(symbol))
 
         if stock_info is None or isinstance(stock_info, str):
             return f"[red]No data available for {symbol}. Please check the stock symbol and try again.[/red]"
@@ -97,32 +177,44 @@ def fetch_stock_data(symbol):
     except Exception as e:
         return f"[red]Error fetching stock data for {symbol}: {e}[/red]"
 
+def fetch_quote_batch(symbols):
+    try:
+        quotes = Ticker(symbols).quotes
+    except Exception:
+        return {}
+    if not isinstance(quotes, dict):
+        return {}
+    return {symbol: quote for symbol, quote in quotes.items() if isinstance(quote, dict)}
+
+def fetch_quotes(symbols):
+    batches = [symbols[i:i + QUOTE_BATCH_SIZE] for i in range(0, len(symbols), QUOTE_BATCH_SIZE)]
+    quotes = {}
+    if not batches:
+        return quotes
+    with ThreadPoolExecutor(max_workers=min(MAX_QUOTE_WORKERS, len(batches))) as executor:
+        for batch_quotes in executor.map(fetch_quote_batch, batches):
+            quotes.update(batch_quotes)
+    return quotes
+
 def show_top_stocks():
     console.print("\n📊 [bold yellow]Fetching Top 10 Stocks with Prices...[/bold yellow]")
-    stock_info = []
+    with console.status("[cyan]Loading stock data...", spinner="dots"):
+        quotes = fetch_quotes(TOP_STOCKS)
 
-    with Progress(console=console) as progress:
-        task = progress.add_task("[cyan]Loading stock data...", total=len(TOP_STOCKS))
-
-        for symbol in TOP_STOCKS:
-            ticker = Ticker(symbol)
-            try:
-                price_data = ticker.price.get(symbol)
-                if isinstance(price_data, dict):
-                    price = price_data.get("regularMarketPrice", "Unavailable")
-                else:
-                    price = "Unavailable"
-                stock_info.append(f"{symbol}: {price} USD")
-            except (AttributeError, TypeError, KeyError):
-                stock_info.append(f"{symbol}: Unavailable")
-            progress.update(task, advance=1)
+    stock_info = []
+    for symbol in TOP_STOCKS:
+        quote = quotes.get(symbol)
+        if quote is None or quote.get("regularMarketPrice") is None:
+            stock_info.append(f"{symbol}: Unavailable")
+        else:
+            stock_info.append(f"{symbol}: {quote['regularMarketPrice']} {quote.get('currency', 'USD')}")
 
     console.print(" | ".join(stock_info))
 
 def fetch_joke():
     joke_url = "https://v2.jokeapi.dev/joke/Any"
     try:
-        response = requests.get(joke_url)
+        response = http_client.get(joke_url)
         response.raise_for_status()
         data = response.json()
         if data["type"] == "single":